@@ -1,5 +1,6 @@
 import contextlib
-import io
+import dataclasses
+import os
 import struct
 import typing
 import uuid
@@ -10,43 +11,102 @@ T = typing.TypeVar("T")
 K = typing.TypeVar("K")
 V = typing.TypeVar("V")
 
+SIGNED_CHAR = struct.Struct("!b")
+SIGNED_SHORT = struct.Struct("!h")
+SIGNED_INT = struct.Struct("!i")
+UNSIGNED_INT = struct.Struct("!I")
+SIGNED_LONG = struct.Struct("!q")
+
+
+@dataclasses.dataclass
+class FileRegion:
+    file: typing.BinaryIO
+    offset: int
+    length: int
+
+    def __len__(self):
+        return self.length
+
+    def read(self) -> bytes:
+        return os.pread(self.file.fileno(), self.length, self.offset)
+
+
+@dataclasses.dataclass
+class FileRegions:
+    regions: typing.List[FileRegion]
+
+    def __len__(self):
+        return sum(map(len, self.regions))
+
+    def read(self) -> bytes:
+        return b"".join(region.read() for region in self.regions)
+
 
 class ByteReader:
 
-    def __init__(self, data: bytes):
-        self._data = io.BytesIO(data)
+    def __init__(self, data: typing.Union[bytes, bytearray, memoryview]):
+        self._view = memoryview(data)
+        self._length = len(self._view)
+        self._offset = 0
 
-    def read(self, n: int):
-        return self._data.read(n)
+    def read(self, n: int) -> bytes:
+        start = self._offset
+        end = start + n
+
+        if n < 0 or end > self._length:
+            end = self._length
+
+        self._offset = end
+        return self._view[start:end].tobytes()
+
+    def read_view(self, n: int) -> memoryview:
+        start = self._offset
+        end = start + n
+
+        if n < 0 or end > self._length:
+            end = self._length
+
+        self._offset = end
+        return self._view[start:end]
 
     def read_signed_char(self):
-        x, = struct.unpack("!b", self.read(1))
+        x, = SIGNED_CHAR.unpack_from(self._view, self._offset)
+        self._offset += 1
         return x
 
     def read_signed_short(self):
-        x, = struct.unpack("!h", self.read(2))
+        x, = SIGNED_SHORT.unpack_from(self._view, self._offset)
+        self._offset += 2
         return x
 
     def read_signed_int(self):
-        x, = struct.unpack("!i", self.read(4))
+        x, = SIGNED_INT.unpack_from(self._view, self._offset)
+        self._offset += 4
         return x
 
     def read_unsigned_int(self):
-        x, = struct.unpack("!I", self.read(4))
+        x, = UNSIGNED_INT.unpack_from(self._view, self._offset)
+        self._offset += 4
         return x
 
     def read_signed_long(self):
-        x, = struct.unpack("!q", self.read(8))
+        x, = SIGNED_LONG.unpack_from(self._view, self._offset)
+        self._offset += 8
         return x
 
+    def read_struct(self, format: struct.Struct) -> tuple:
+        values = format.unpack_from(self._view, self._offset)
+        self._offset += format.size
+        return values
+
     def read_signed_varlong(self):
-        return varint.read_signed_long(self._data)
+        return varint.zigzag_decode(self._read_varint(64))
 
     def read_signed_varint(self):
-        return varint.read_signed_int(self._data)
+        return varint.zigzag_decode(self._read_varint(32))
 
     def read_unsigned_varint(self):
-        return varint.read_unsigned_int(self._data)
+        return self._read_varint(32)
 
     def read_uuid(self):
         return uuid.UUID(bytes=self.read(16))
@@ -57,7 +117,7 @@ class ByteReader:
         if length == -1:
             return None
 
-        return self.read(length).decode("utf-8")
+        return str(self.read_view(length), "utf-8")
 
     def read_compact_string(self):
         length = self.read_unsigned_varint()
@@ -65,7 +125,7 @@ class ByteReader:
         if length == 0:
             return None
 
-        return self.read(length - 1).decode("utf-8")
+        return str(self.read_view(length - 1), "utf-8")
 
     def skip_empty_tagged_field_array(self):
         self.read_unsigned_varint()
@@ -109,9 +169,17 @@ class ByteReader:
     def read_compact_bytes(self):
         length = self.read_unsigned_varint()
 
-        if length == 1:
+        if length == 0:
+            return None
+
+        return self.read(length - 1)
+
+    def read_compact_records(self):
+        length = self.read_unsigned_varint()
+
+        if length == 0:
             return None
-    
+
         return self.read(length - 1)
 
     def read_compact_dict(
@@ -131,44 +199,136 @@ class ByteReader:
 
     @contextlib.contextmanager
     def mark(self):
-        offset = self._data.tell()
+        offset = self._offset
 
         try:
             yield
         finally:
-            self._data.seek(offset)
+            self._offset = offset
 
     @property
     def eof(self):
-        with self.mark():
-            return len(self.read(1)) == 0
+        return self._offset >= self._length
+
+    def _read_varint(self, bits: int):
+        offset = self._offset
+
+        if offset + 1 < self._length:
+            value = self._view[offset]
+            if value < 0x80:
+                self._offset = offset + 1
+                return value
+
+            second = self._view[offset + 1]
+            if second < 0x80:
+                self._offset = offset + 2
+                return (value & 0x7F) | (second << 7)
+
+        value, self._offset = varint.decode_unsigned(self._view, offset, bits)
+        return value
 
 
 class ByteWriter:
 
-    def __init__(self):
-        self._data = io.BytesIO()
+    INLINE_THRESHOLD = 4096
+    DEFAULT_CAPACITY = 256
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self._data = bytearray(capacity)
+        self._capacity = capacity
+        self._start = 0
+        self._position = 0
+        self._buffers: typing.List[typing.Union[memoryview, bytes, FileRegion]] = []
+
+    def __len__(self):
+        return sum(map(len, self._buffers)) + self._position - self._start
+
+    @property
+    def capacity(self):
+        return self._capacity
 
     def write(self, bytes: bytes):
-        self._data.write(bytes)
+        size = len(bytes)
+
+        position = self._position
+        if position + size > self._capacity:
+            position = self._grow(size)
+
+        self._data[position:position + size] = bytes
+        self._position = position + size
+
+    def write_buffer(self, buffer: typing.Union[bytes, memoryview, FileRegion, FileRegions]):
+        if isinstance(buffer, FileRegions):
+            for region in buffer.regions:
+                self.write_buffer(region)
+
+            return
+
+        if isinstance(buffer, FileRegion):
+            if not buffer.length:
+                return
+        elif len(buffer) < self.INLINE_THRESHOLD:
+            return self.write(buffer)
+
+        self._flush_inline()
+        self._buffers.append(buffer)
 
     def write_boolean(self, value: bool):
         self.write_byte(int(value))
 
     def write_byte(self, value: int):
-        self.write(bytes([value]))
+        position = self._position
+        if position + 1 > self._capacity:
+            position = self._grow(1)
+
+        self._data[position] = value
+        self._position = position + 1
 
     def write_signed_short(self, value: int):
-        self.write(struct.pack("!h", value))
+        position = self._position
+        if position + 2 > self._capacity:
+            position = self._grow(2)
+
+        SIGNED_SHORT.pack_into(self._data, position, value)
+        self._position = position + 2
 
     def write_signed_int(self, value: int):
-        self.write(struct.pack("!i", value))
+        position = self._position
+        if position + 4 > self._capacity:
+            position = self._grow(4)
+
+        SIGNED_INT.pack_into(self._data, position, value)
+        self._position = position + 4
 
     def write_signed_long(self, value: int):
-        self.write(struct.pack("!q", value))
+        position = self._position
+        if position + 8 > self._capacity:
+            position = self._grow(8)
+
+        SIGNED_LONG.pack_into(self._data, position, value)
+        self._position = position + 8
+
+    def write_struct(self, format: struct.Struct, *values):
+        size = format.size
+
+        position = self._position
+        if position + size > self._capacity:
+            position = self._grow(size)
+
+        format.pack_into(self._data, position, *values)
+        self._position = position + size
 
     def write_unsigned_varint(self, value: int):
-        varint.write_unsigned_int(self._data, value)
+        if value < 0x80:
+            return self.write_byte(value)
+
+        size = varint.unsigned_size(value)
+
+        position = self._position
+        if position + size > self._capacity:
+            position = self._grow(size)
+
+        self._position = varint.encode_unsigned_into(self._data, position, value)
 
     def write_uuid(self, value: uuid.UUID):
         self.write(value.bytes)
@@ -191,6 +351,20 @@ class ByteWriter:
         self.write_unsigned_varint(len(bytes) + 1)
         self.write(bytes)
 
+    def write_bytes(self, value: typing.Optional[bytes]):
+        if value is None:
+            return self.write_signed_int(-1)
+
+        self.write_signed_int(len(value))
+        self.write(value)
+
+    def write_compact_bytes(self, value: typing.Optional[bytes]):
+        if value is None:
+            return self.write_unsigned_varint(0)
+
+        self.write_unsigned_varint(len(value) + 1)
+        self.write(value)
+
     def write_compact_array(
         self,
         items: typing.List[T],
@@ -207,18 +381,57 @@ class ByteWriter:
 
     def write_compact_records(
         self,
-        records: bytes,
+        records: typing.Union[bytes, FileRegion, FileRegions],
     ):
         if records is None:
             self.write_unsigned_varint(0)
             return
 
         self.write_unsigned_varint(len(records) + 1)
-        self.write(records)
+        self.write_buffer(records)
+
+    def write_records(
+        self,
+        records: typing.Union[bytes, FileRegion, FileRegions],
+    ):
+        if records is None:
+            self.write_signed_int(-1)
+            return
+
+        self.write_signed_int(len(records))
+        self.write_buffer(records)
 
     def skip_empty_tagged_field_array(self):
         self.write_unsigned_varint(0)
 
+    @property
+    def buffers(self) -> typing.List[typing.Union[memoryview, bytes, FileRegion]]:
+        self._flush_inline()
+        return self._buffers
+
     @property
     def bytes(self):
-        return self._data.getvalue()
+        return b"".join(
+            buffer.read() if isinstance(buffer, FileRegion) else buffer
+            for buffer in self.buffers
+        )
+
+    def _grow(self, size: int) -> int:
+        pending = self._position - self._start
+
+        data = bytearray(max(2 * len(self._data), pending + size))
+        data[:pending] = memoryview(self._data)[self._start:self._position]
+
+        self._data = data
+        self._capacity = len(data)
+        self._start = 0
+        self._position = pending
+
+        return pending
+
+    def _flush_inline(self):
+        if self._position == self._start:
+            return
+
+        self._buffers.append(memoryview(self._data)[self._start:self._position])
+        self._start = self._position
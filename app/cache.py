@@ -0,0 +1,44 @@
+import collections
+import threading
+import typing
+
+Key = typing.Tuple[int, int, typing.Hashable]
+
+
+class ResponseCache:
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+
+        self._entries: "collections.OrderedDict[Key, bytes]" = collections.OrderedDict()
+        self._epoch: typing.Optional[int] = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Key, epoch: int) -> typing.Optional[bytes]:
+        with self._lock:
+            if epoch != self._epoch:
+                self._entries.clear()
+                self._epoch = epoch
+                return None
+
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+
+            return data
+
+    def put(self, key: Key, epoch: int, data: bytes):
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            if epoch != self._epoch:
+                return
+
+            self._entries[key] = data
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
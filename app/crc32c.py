@@ -0,0 +1,137 @@
+import functools
+import struct
+import typing
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+POLYNOMIAL = 0x82F63B78
+
+BULK_THRESHOLD = 4096
+LANE_SIZE = 32
+
+_WORDS = struct.Struct("<II")
+
+
+def _tables():
+    table = []
+    for value in range(256):
+        for _ in range(8):
+            value = (value >> 1) ^ POLYNOMIAL if value & 1 else value >> 1
+
+        table.append(value)
+
+    tables = [table]
+    for _ in range(7):
+        tables.append([(entry >> 8) ^ table[entry & 0xff] for entry in tables[-1]])
+
+    return tables
+
+
+_TABLES = _tables()
+
+
+def crc32c(data: typing.Union[bytes, bytearray, memoryview], value: int = 0) -> int:
+    view = memoryview(data).cast("B")
+    crc = value ^ 0xffffffff
+
+    if numpy is not None and len(view) >= BULK_THRESHOLD:
+        crc, view = _update_lanes(crc, view)
+
+    return _update(crc, view) ^ 0xffffffff
+
+
+def _update(crc: int, view: memoryview) -> int:
+    t0, t1, t2, t3, t4, t5, t6, t7 = _TABLES
+    aligned = len(view) - len(view) % 8
+
+    for low, high in _WORDS.iter_unpack(view[:aligned]):
+        low ^= crc
+        crc = (
+            t7[low & 0xff] ^ t6[low >> 8 & 0xff] ^ t5[low >> 16 & 0xff] ^ t4[low >> 24]
+            ^ t3[high & 0xff] ^ t2[high >> 8 & 0xff] ^ t1[high >> 16 & 0xff] ^ t0[high >> 24]
+        )
+
+    for byte in view[aligned:]:
+        crc = t0[(crc ^ byte) & 0xff] ^ (crc >> 8)
+
+    return crc
+
+
+def _update_lanes(crc: int, view: memoryview) -> typing.Tuple[int, memoryview]:
+    count = len(view) // LANE_SIZE
+    words = numpy.frombuffer(view, dtype="<u4", count=count * LANE_SIZE // 4).reshape(count, LANE_SIZE // 4)
+    t0, t1, t2, t3 = _numpy_tables()
+
+    state = numpy.zeros(count, dtype=numpy.uint32)
+    state[0] = crc
+
+    for column in range(LANE_SIZE // 4):
+        state ^= words[:, column]
+        state = t3[state & 0xff] ^ t2[(state >> 8) & 0xff] ^ t1[(state >> 16) & 0xff] ^ t0[state >> 24]
+
+    size = LANE_SIZE
+    while len(state) > 1:
+        if len(state) % 2:
+            state = numpy.concatenate((numpy.zeros(1, dtype=numpy.uint32), state))
+
+        s0, s1, s2, s3 = _shift_tables(size)
+        head, tail = state[0::2], state[1::2]
+        state = s0[head & 0xff] ^ s1[(head >> 8) & 0xff] ^ s2[(head >> 16) & 0xff] ^ s3[head >> 24] ^ tail
+
+        size *= 2
+
+    return int(state[0]), view[count * LANE_SIZE:]
+
+
+@functools.lru_cache(maxsize=None)
+def _numpy_tables():
+    return numpy.array(_TABLES[:4], dtype=numpy.uint32)
+
+
+@functools.lru_cache(maxsize=None)
+def _shift_tables(size: int):
+    basis = _shift_basis(size)
+
+    tables = numpy.zeros((4, 256), dtype=numpy.uint32)
+    for index in range(4):
+        for bit in range(8):
+            step = 1 << bit
+            tables[index, step:2 * step] = tables[index, :step] ^ basis[8 * index + bit]
+
+    return tables
+
+
+@functools.lru_cache(maxsize=None)
+def _shift_basis(size: int) -> typing.Tuple[int, ...]:
+    if size <= LANE_SIZE or size % 2:
+        table = _TABLES[0]
+        basis = []
+
+        for bit in range(32):
+            crc = 1 << bit
+            for _ in range(size):
+                crc = table[crc & 0xff] ^ (crc >> 8)
+
+            basis.append(crc)
+
+        return tuple(basis)
+
+    half = _shift_basis(size // 2)
+    return tuple(_apply(half, _apply(half, 1 << bit)) for bit in range(32))
+
+
+def _apply(basis: typing.Tuple[int, ...], crc: int) -> int:
+    result = 0
+
+    bit = 0
+    while crc:
+        if crc & 1:
+            result ^= basis[bit]
+
+        crc >>= 1
+        bit += 1
+
+    return result
@@ -0,0 +1,105 @@
+import concurrent.futures
+import threading
+import time
+import typing
+
+from . import log
+
+
+class Flusher:
+
+    def __init__(
+        self,
+        flush_messages: typing.Optional[int] = None,
+        flush_ms: typing.Optional[int] = None,
+    ):
+        self.flush_messages = flush_messages
+        self.flush_ms = flush_ms
+
+        self._condition = threading.Condition()
+        self._thread: typing.Optional[threading.Thread] = None
+
+        self._dirty: typing.Set[log.Log] = set()
+        self._waiters: typing.List[typing.Tuple[log.Log, concurrent.futures.Future]] = []
+        self._messages = 0
+        self._oldest: typing.Optional[float] = None
+
+    def track(
+        self,
+        partition_log: log.Log,
+        messages: int,
+        wait: bool = False,
+    ) -> typing.Optional[concurrent.futures.Future]:
+        future = concurrent.futures.Future() if wait else None
+
+        with self._condition:
+            self._ensure_started()
+
+            self._dirty.add(partition_log)
+            self._messages += messages
+
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+
+            if future is not None:
+                self._waiters.append((partition_log, future))
+
+            if self._should_flush(time.monotonic()):
+                self._condition.notify()
+
+        return future
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._thread = threading.Thread(target=self._run, name="flusher", daemon=True)
+        self._thread.start()
+
+    def _should_flush(self, now: float):
+        if not self._dirty:
+            return False
+
+        if self._waiters:
+            return True
+
+        if self.flush_messages is not None and self._messages >= self.flush_messages:
+            return True
+
+        if self.flush_ms is not None and (now - self._oldest) * 1000 >= self.flush_ms:
+            return True
+
+        return False
+
+    def _timeout(self, now: float):
+        if not self._dirty or self.flush_ms is None:
+            return None
+
+        return max(0, self._oldest + self.flush_ms / 1000 - now)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._should_flush(time.monotonic()):
+                    self._condition.wait(self._timeout(time.monotonic()))
+
+                dirty, self._dirty = self._dirty, set()
+                waiters, self._waiters = self._waiters, []
+                self._messages = 0
+                self._oldest = None
+
+            errors: typing.Dict[log.Log, OSError] = {}
+            for partition_log in dirty:
+                try:
+                    partition_log.fsync()
+                except OSError as error:
+                    print(f"flush: {partition_log.path}: {error}")
+                    errors[partition_log] = error
+
+            for partition_log, waiter in waiters:
+                error = errors.get(partition_log)
+
+                if error is None:
+                    waiter.set_result(None)
+                else:
+                    waiter.set_exception(error)
@@ -0,0 +1,693 @@
+import bisect
+import contextlib
+import fcntl
+import os
+import struct
+import threading
+import typing
+
+from . import buffer, crc32c
+from .protocol import record
+
+CRC = struct.Struct("!I")
+CRC_OFFSET = 17
+ATTRIBUTES_OFFSET = 21
+
+BASE_OFFSET = struct.Struct("!q")
+
+MAGIC = 2
+
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+INDEX_INTERVAL_BYTES = 4096
+
+DEFAULT_SEGMENT_BYTES = 1024 * 1024 * 1024
+MAX_RELATIVE_OFFSET = 2 ** 31 - 1
+
+
+class InvalidRecordError(ValueError):
+    pass
+
+
+class BatchHeader(typing.NamedTuple):
+    position: int
+    base_offset: int
+    last_offset: int
+    size: int
+    attributes: int
+    max_timestamp: int
+
+
+class Index:
+
+    ENTRY: struct.Struct
+
+    def __init__(self, path: str, base_offset: int):
+        self.path = path
+        self.base_offset = base_offset
+
+        self._keys: typing.List[int] = []
+        self._values: typing.List[int] = []
+
+    def __len__(self):
+        return len(self._keys)
+
+    @property
+    def last(self) -> typing.Optional[typing.Tuple[int, int]]:
+        if not self._keys:
+            return None
+
+        return self._keys[-1], self._values[-1]
+
+    def load(self) -> bool:
+        try:
+            with open(self.path, "rb") as fd:
+                data = fd.read()
+        except FileNotFoundError:
+            return False
+
+        entries = list(self.ENTRY.iter_unpack(data[:len(data) - len(data) % self.ENTRY.size]))
+
+        while entries and entries[-1] == (0, 0):
+            entries.pop()
+
+        entries = [self._decode(*entry) for entry in entries]
+
+        for (previous_key, previous_value), (key, value) in zip(entries, entries[1:]):
+            if key <= previous_key or value < previous_value:
+                return False
+
+        self._keys = [key for key, _ in entries]
+        self._values = [value for _, value in entries]
+
+        if len(data) != len(entries) * self.ENTRY.size:
+            self._write()
+
+        return True
+
+    def reset(self):
+        self._keys = []
+        self._values = []
+
+        self._write()
+
+    def append(self, key: int, value: int):
+        self._keys.append(key)
+        self._values.append(value)
+
+        with open(self.path, "ab") as fd:
+            if os.fstat(fd.fileno()).st_size < len(self._keys) * self.ENTRY.size:
+                fd.write(self.ENTRY.pack(*self._encode(key, value)))
+
+    def lookup(self, key: int) -> typing.Optional[typing.Tuple[int, int]]:
+        index = bisect.bisect_right(self._keys, key) - 1
+
+        if index < 0:
+            return None
+
+        return self._keys[index], self._values[index]
+
+    def _encode(self, key: int, value: int) -> typing.Tuple[int, int]:
+        raise NotImplementedError()
+
+    def _decode(self, key: int, value: int) -> typing.Tuple[int, int]:
+        raise NotImplementedError()
+
+    def _write(self):
+        with open(self.path, "wb") as fd:
+            fd.write(b"".join(
+                self.ENTRY.pack(*self._encode(key, value))
+                for key, value in zip(self._keys, self._values)
+            ))
+
+
+class OffsetIndex(Index):
+
+    ENTRY = struct.Struct("!ii")
+
+    def lookup(self, offset: int) -> typing.Tuple[int, int]:
+        return super().lookup(offset) or (self.base_offset, 0)
+
+    def _encode(self, offset: int, position: int):
+        return offset - self.base_offset, position
+
+    def _decode(self, relative_offset: int, position: int):
+        return self.base_offset + relative_offset, position
+
+
+class TimeIndex(Index):
+
+    ENTRY = struct.Struct("!qi")
+
+    def lookup(self, timestamp: int) -> typing.Tuple[int, int]:
+        return super().lookup(timestamp) or (-1, self.base_offset)
+
+    def _encode(self, timestamp: int, offset: int):
+        return timestamp, offset - self.base_offset
+
+    def _decode(self, timestamp: int, relative_offset: int):
+        return timestamp, self.base_offset + relative_offset
+
+
+class Segment:
+
+    def __init__(self, directory: str, base_offset: int = 0, verify: bool = False):
+        self.directory = directory
+        self.base_offset = base_offset
+        self.path = segment_path(directory, base_offset, ".log")
+
+        self.file = open(self.path, "rb")
+        self.writer: typing.Optional[typing.BinaryIO] = None
+        self.index = OffsetIndex(segment_path(directory, base_offset, ".index"), base_offset)
+        self.time_index = TimeIndex(segment_path(directory, base_offset, ".timeindex"), base_offset)
+
+        self.size = 0
+        self.next_offset = base_offset
+        self.max_timestamp = -1
+        self.offset_of_max_timestamp = -1
+
+        self._bytes_since_last_index_entry = 0
+        self._first_timestamp: typing.Optional[int] = None
+        self._lock = threading.Lock()
+
+        self._recover(verify)
+
+    @property
+    def first_timestamp(self) -> int:
+        if self._first_timestamp is None:
+            for batch in self._scan(0, self.size):
+                self._first_timestamp = batch.max_timestamp
+                break
+            else:
+                return -1
+
+        return self._first_timestamp
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+        self.file.close()
+
+    def refresh(self):
+        with self._lock:
+            self._sync()
+
+    def fsync(self):
+        if self.writer is not None:
+            os.fsync(self.writer.fileno())
+
+    def seal(self):
+        if self.writer is None:
+            return
+
+        os.fsync(self.writer.fileno())
+
+        self.writer.close()
+        self.writer = None
+
+    def try_append(
+        self,
+        records: bytes,
+        headers: typing.List[typing.Tuple[int, int]],
+        should_roll: typing.Callable[["Segment"], bool],
+    ) -> typing.Optional[typing.Tuple[int, int]]:
+        with self._lock, self._exclusive():
+            self._catch_up()
+
+            next_path = segment_path(self.directory, self.next_offset, ".log")
+            if self.size and os.path.exists(next_path):
+                return None
+
+            if should_roll(self):
+                open(next_path, "ab").close()
+                return None
+
+            return self._append(records, headers)
+
+    def _append(
+        self,
+        records: bytes,
+        headers: typing.List[typing.Tuple[int, int]],
+    ) -> typing.Tuple[int, int]:
+        data = bytearray(records)
+
+        if self.writer is None:
+            self.writer = open(self.path, "ab", buffering=WRITE_BUFFER_SIZE)
+
+        base_offset = offset = self.next_offset
+        for position, last_offset_delta in headers:
+            BASE_OFFSET.pack_into(data, position, offset)
+            offset += last_offset_delta + 1
+
+        self.writer.write(data)
+        self.writer.flush()
+
+        self._catch_up()
+
+        return base_offset, offset
+
+    def read(
+        self,
+        offset: int,
+        max_bytes: int,
+    ) -> typing.Optional[buffer.FileRegion]:
+        with self._lock:
+            self._sync()
+
+            if offset < self.base_offset or offset > self.next_offset:
+                return None
+
+            batch = self._find_batch(offset)
+            if batch is None:
+                return buffer.FileRegion(self.file, self.size, 0)
+
+            length = max(min(max_bytes, self.size - batch.position), batch.size)
+            return buffer.FileRegion(self.file, batch.position, length)
+
+    def find_offset_by_timestamp(
+        self,
+        timestamp: int,
+    ) -> typing.Optional[typing.Tuple[int, int]]:
+        with self._lock:
+            self._sync()
+
+            _, offset = self.time_index.lookup(timestamp)
+            _, position = self.index.lookup(offset)
+
+            for batch in self._scan(position, self.size):
+                if batch.max_timestamp >= timestamp:
+                    return self._find_record(batch, timestamp)
+
+            return None
+
+    def find_max_timestamp(self) -> typing.Optional[typing.Tuple[int, int]]:
+        with self._lock:
+            self._sync()
+
+            if self.offset_of_max_timestamp == -1:
+                return None
+
+            batch = self._find_batch(self.offset_of_max_timestamp)
+            if batch is None:
+                return None
+
+            return self._find_record(batch, self.max_timestamp)
+
+    def _find_batch(self, offset: int) -> typing.Optional[BatchHeader]:
+        _, position = self.index.lookup(offset)
+
+        for batch in self._scan(position, self.size):
+            if batch.last_offset >= offset:
+                return batch
+
+        return None
+
+    def _find_record(
+        self,
+        batch: BatchHeader,
+        timestamp: int,
+    ) -> typing.Tuple[int, int]:
+        if batch.attributes & record.COMPRESSION_CODEC_MASK:
+            return batch.max_timestamp, batch.base_offset
+
+        data = os.pread(self.file.fileno(), batch.size, batch.position)
+        records_batch = record.Batch.deserialize(buffer.ByteReader(data))
+
+        for item in records_batch.records:
+            record_timestamp = records_batch.base_timestamp + item.timestamp_delta
+
+            if record_timestamp >= timestamp:
+                return record_timestamp, batch.base_offset + item.offset_delta
+
+        return batch.max_timestamp, batch.last_offset
+
+    @contextlib.contextmanager
+    def _exclusive(self):
+        fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+
+        try:
+            yield
+        finally:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+
+    def _recover(self, verify: bool):
+        with self._exclusive():
+            self._recover_locked()
+
+            end = self._verified_end() if verify else self.size
+
+            size = os.fstat(self.file.fileno()).st_size
+            if size > end:
+                print(f"log: {self.path}: truncating {size - end} invalid bytes at {end}")
+                os.truncate(self.path, end)
+
+                if end < self.size:
+                    self._reset()
+
+    def _recover_locked(self):
+        size = os.fstat(self.file.fileno()).st_size
+
+        if not self.index.load() or not self.time_index.load():
+            return self._reset()
+
+        last = self.index.last
+        if last is None or last[1] >= size:
+            return self._reset()
+
+        _, position = last
+        for batch in self._scan(position, size):
+            self._advance(batch)
+            self._bytes_since_last_index_entry = batch.size
+            break
+        else:
+            return self._reset()
+
+        last = self.time_index.last
+        if last is not None and last[0] > self.max_timestamp:
+            self.max_timestamp, self.offset_of_max_timestamp = last
+
+        self._catch_up()
+
+    def _reset(self):
+        self.index.reset()
+        self.time_index.reset()
+
+        self.size = 0
+        self.next_offset = self.base_offset
+        self.max_timestamp = -1
+        self.offset_of_max_timestamp = -1
+        self._bytes_since_last_index_entry = 0
+
+        self._catch_up()
+
+    def _verified_end(self) -> int:
+        last = self.index.last
+        end = 0 if last is None else last[1]
+
+        for batch in self._scan(end, self.size, verify=True):
+            end = batch.position + batch.size
+
+        return end
+
+    def _sync(self):
+        if os.fstat(self.file.fileno()).st_size == self.size:
+            return
+
+        with self._exclusive():
+            self._catch_up()
+
+    def _catch_up(self):
+        size = os.fstat(self.file.fileno()).st_size
+        if size == self.size:
+            return
+
+        for batch in self._scan(self.size, size):
+            if self._bytes_since_last_index_entry > INDEX_INTERVAL_BYTES:
+                self.index.append(batch.last_offset, batch.position)
+                self._bytes_since_last_index_entry = 0
+
+                self._advance(batch)
+                self._maybe_append_time_index()
+            else:
+                self._advance(batch)
+
+            self._bytes_since_last_index_entry += batch.size
+
+    def _advance(self, batch: BatchHeader):
+        if batch.max_timestamp > self.max_timestamp:
+            self.max_timestamp = batch.max_timestamp
+            self.offset_of_max_timestamp = batch.last_offset
+
+        self.size = batch.position + batch.size
+        self.next_offset = batch.last_offset + 1
+
+    def _maybe_append_time_index(self):
+        last = self.time_index.last
+
+        if last is None or self.max_timestamp > last[0]:
+            self.time_index.append(self.max_timestamp, self.offset_of_max_timestamp)
+
+    def _scan(
+        self,
+        position: int,
+        end: int,
+        verify: bool = False,
+    ) -> typing.Iterator[BatchHeader]:
+        fileno = self.file.fileno()
+
+        while position + record.BATCH_HEADER.size <= end:
+            data = os.pread(fileno, record.BATCH_HEADER.size, position)
+            if len(data) != record.BATCH_HEADER.size:
+                return
+
+            base_offset, batch_length, _, _, _, attributes, last_offset_delta, _, max_timestamp, *_ = record.BATCH_HEADER.unpack(data)
+
+            batch_size = record.LOG_OVERHEAD + batch_length
+            if batch_size < record.BATCH_HEADER.size or position + batch_size > end:
+                return
+
+            if verify and not valid_crc(os.pread(fileno, batch_size, position)):
+                return
+
+            yield BatchHeader(
+                position,
+                base_offset,
+                base_offset + last_offset_delta,
+                batch_size,
+                attributes,
+                max_timestamp,
+            )
+
+            position += batch_size
+
+
+class Log:
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+        segment_ms: typing.Optional[int] = None,
+    ):
+        self.path = directory
+        self.segment_bytes = segment_bytes
+        self.segment_ms = segment_ms
+
+        self.segments: typing.List[Segment] = []
+
+        self._base_offsets: typing.List[int] = []
+        self._sealing: typing.List[Segment] = []
+        self._lock = threading.Lock()
+
+        base_offsets = sorted(
+            int(name[:-len(".log")])
+            for name in os.listdir(directory)
+            if name.endswith(".log")
+        )
+
+        if not base_offsets:
+            open(segment_path(directory, 0, ".log"), "ab").close()
+            base_offsets.append(0)
+
+        for base_offset in base_offsets:
+            self._add(Segment(directory, base_offset, verify=base_offset == base_offsets[-1]))
+
+    @property
+    def base_offset(self):
+        return self.segments[0].base_offset
+
+    @property
+    def next_offset(self):
+        return self.segments[-1].next_offset
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+
+    def refresh(self):
+        with self._lock:
+            self._discover()
+
+    def fsync(self):
+        with self._lock:
+            sealing, self._sealing = self._sealing, []
+            active = self.segments[-1]
+
+        for index, segment in enumerate(sealing):
+            try:
+                segment.seal()
+            except OSError:
+                with self._lock:
+                    self._sealing[:0] = sealing[index:]
+
+                raise
+
+        active.fsync()
+
+    def append(self, records: bytes) -> typing.Tuple[int, int]:
+        headers = validate_batches(records)
+
+        with self._lock:
+            while True:
+                segment = self.segments[-1]
+
+                appended = segment.try_append(
+                    records,
+                    headers,
+                    lambda segment: self._should_roll(segment, records, headers),
+                )
+
+                if appended is not None:
+                    return appended
+
+                self._add(Segment(self.path, segment.next_offset))
+
+    def read(
+        self,
+        offset: int,
+        max_bytes: int,
+    ) -> typing.Optional[buffer.FileRegions]:
+        with self._lock:
+            self._discover()
+
+            index = bisect.bisect_right(self._base_offsets, offset) - 1
+            if index < 0:
+                return None
+
+            segments = self.segments[index:]
+
+        region = segments[0].read(offset, max_bytes)
+        if region is None:
+            return None
+
+        regions = [region]
+        remaining = max_bytes - len(region)
+
+        for previous, segment in zip(segments, segments[1:]):
+            if remaining <= 0 or region.offset + region.length < previous.size:
+                break
+
+            segment.refresh()
+
+            region = buffer.FileRegion(segment.file, 0, min(remaining, segment.size))
+            if not region.length:
+                break
+
+            regions.append(region)
+            remaining -= region.length
+
+        return buffer.FileRegions(regions)
+
+    def find_offset_by_timestamp(
+        self,
+        timestamp: int,
+    ) -> typing.Optional[typing.Tuple[int, int]]:
+        self.refresh()
+
+        for segment in list(self.segments):
+            if segment.max_timestamp < timestamp:
+                continue
+
+            found = segment.find_offset_by_timestamp(timestamp)
+            if found is not None:
+                return found
+
+        return None
+
+    def find_max_timestamp(self) -> typing.Optional[typing.Tuple[int, int]]:
+        self.refresh()
+
+        latest: typing.Optional[Segment] = None
+        for segment in list(self.segments):
+            if latest is None or segment.max_timestamp > latest.max_timestamp:
+                latest = segment
+
+        return latest.find_max_timestamp()
+
+    def _add(self, segment: Segment):
+        if self.segments and self.segments[-1].writer is not None:
+            self._sealing.append(self.segments[-1])
+
+        self.segments.append(segment)
+        self._base_offsets.append(segment.base_offset)
+
+    def _discover(self):
+        while True:
+            active = self.segments[-1]
+            active.refresh()
+
+            if active.next_offset == active.base_offset:
+                return
+
+            if not os.path.exists(segment_path(self.path, active.next_offset, ".log")):
+                return
+
+            self._add(Segment(self.path, active.next_offset))
+
+    def _should_roll(
+        self,
+        segment: Segment,
+        records: bytes,
+        headers: typing.List[typing.Tuple[int, int]],
+    ):
+        if not segment.size:
+            return False
+
+        if segment.size + len(records) > self.segment_bytes:
+            return True
+
+        last_offset = segment.next_offset + sum(last_offset_delta + 1 for _, last_offset_delta in headers) - 1
+        if last_offset - segment.base_offset > MAX_RELATIVE_OFFSET:
+            return True
+
+        if self.segment_ms is not None and segment.first_timestamp >= 0:
+            max_timestamp = max(record.BATCH_HEADER.unpack_from(records, position)[8] for position, _ in headers)
+            return max_timestamp - segment.first_timestamp >= self.segment_ms
+
+        return False
+
+
+def segment_path(
+    directory: str,
+    base_offset: int,
+    suffix: str,
+):
+    return os.path.join(directory, f"{base_offset:020d}{suffix}")
+
+
+def validate_batches(records: bytes) -> typing.List[typing.Tuple[int, int]]:
+    headers = []
+    position = 0
+
+    while position < len(records):
+        if len(records) - position < record.BATCH_HEADER.size:
+            raise InvalidRecordError("truncated batch header")
+
+        _, batch_length, _, magic, _, _, last_offset_delta, *_ = record.BATCH_HEADER.unpack_from(records, position)
+
+        batch_size = record.LOG_OVERHEAD + batch_length
+        if batch_size < record.BATCH_HEADER.size or position + batch_size > len(records):
+            raise InvalidRecordError(f"invalid batch length: {batch_length}")
+
+        if magic != MAGIC:
+            raise InvalidRecordError(f"unsupported magic: {magic}")
+
+        if last_offset_delta < 0:
+            raise InvalidRecordError(f"invalid last offset delta: {last_offset_delta}")
+
+        if not valid_crc(memoryview(records)[position:position + batch_size]):
+            raise InvalidRecordError("record batch crc mismatch")
+
+        headers.append((position, last_offset_delta))
+        position += batch_size
+
+    if not headers:
+        raise InvalidRecordError("no record batch")
+
+    return headers
+
+
+def valid_crc(batch: typing.Union[bytes, memoryview]) -> bool:
+    crc, = CRC.unpack_from(batch, CRC_OFFSET)
+    return crc32c.crc32c(memoryview(batch)[ATTRIBUTES_OFFSET:]) == crc
@@ -1,132 +1,215 @@
+import asyncio
+import bisect
+import concurrent.futures
+import functools
 import itertools
 import os
+import signal
 import socket
+import threading
+import time
 import typing
 import uuid
 
-from . import buffer, protocol
+from . import cache, flusher, log, metadata, protocol, purgatory, session
 
 PORT = 9092
+LOG_DIRECTORY = os.environ.get("KAFKA_LOG_DIRECTORY", "/tmp/kraft-combined-logs")
+BACKLOG = int(os.environ.get("KAFKA_BACKLOG", 4096))
+MODE = os.environ.get("KAFKA_SERVER_MODE", "asyncio")
+PIPELINE_DEPTH = int(os.environ.get("KAFKA_PIPELINE_DEPTH", 16))
+WORKERS = int(os.environ.get("KAFKA_WORKERS", 0)) or os.cpu_count() or 1
+WORKER_RESTART_DELAY = 1.0
+SEGMENT_BYTES = int(os.environ.get("KAFKA_LOG_SEGMENT_BYTES", log.DEFAULT_SEGMENT_BYTES))
+SEGMENT_MS = int(os.environ.get("KAFKA_LOG_ROLL_MS", 7 * 24 * 60 * 60 * 1000))
+NODE_ID = int(os.environ.get("KAFKA_NODE_ID", 1))
+ADVERTISED_HOST = os.environ.get("KAFKA_ADVERTISED_HOST", "localhost")
+DESCRIBE_TOPIC_PARTITIONS_LIMIT = max(1, int(os.environ.get("KAFKA_MAX_REQUEST_PARTITION_SIZE_LIMIT", 2000)))
 
+LATEST_TIMESTAMP = -1
+EARLIEST_TIMESTAMP = -2
+MAX_TIMESTAMP = -3
+EARLIEST_LOCAL_TIMESTAMP = -4
+LATEST_TIERED_TIMESTAMP = -5
 
-def _read_batches_bytes(
-    topic_name="__cluster_metadata",
-    partition_index=0
-):
-    cluster_meta_data_path = f"/tmp/kraft-combined-logs/{topic_name}-{partition_index}/00000000000000000000.log"
-    # os.system(f"cat {cluster_meta_data_path} | base64")
 
-    with open(cluster_meta_data_path, "rb") as fd:
-        return fd.read()
+metadata_image = metadata.MetadataImage(f"{LOG_DIRECTORY}/__cluster_metadata-0")
+
+log_flusher = flusher.Flusher(
+    flush_messages=int(os.environ["KAFKA_FLUSH_MESSAGES"]) if "KAFKA_FLUSH_MESSAGES" in os.environ else None,
+    flush_ms=int(os.environ["KAFKA_FLUSH_MS"]) if "KAFKA_FLUSH_MS" in os.environ else None,
+)
+
+fetch_purgatory = purgatory.Purgatory()
+
+fetch_sessions = session.SessionCache(
+    max_sessions=int(os.environ.get("KAFKA_FETCH_SESSION_CACHE_SLOTS", 1000)),
+)
+
+response_cache = cache.ResponseCache(
+    max_entries=int(os.environ.get("KAFKA_RESPONSE_CACHE_SIZE", 1024)),
+)
 
+_PendingFlushes = typing.List[typing.Tuple[protocol.message.ProduceResponse.PartitionProduceResponse, concurrent.futures.Future]]
 
-def _read_batches(
-    topic_name="__cluster_metadata",
-    partition_index=0
+_MetadataTopicTables = typing.Tuple[
+    typing.Dict[str, protocol.message.MetadataResponse.MetadataResponseTopic],
+    typing.Dict[uuid.UUID, protocol.message.MetadataResponse.MetadataResponseTopic],
+]
+
+_metadata_topic_tables: typing.Tuple[int, _MetadataTopicTables] = (-1, ({}, {}))
+
+_logs: typing.Dict[typing.Tuple[str, int], log.Log] = {}
+_logs_lock = threading.Lock()
+
+
+def _partition_directory(
+    topic_name: str,
+    partition_index: int
 ):
-    topics: typing.List[protocol.record.TopicRecord] = []
-    partitions: typing.List[protocol.record.PartitionRecord] = []
+    return f"{LOG_DIRECTORY}/{topic_name}-{partition_index}"
 
-    reader = buffer.ByteReader(_read_batches_bytes(topic_name, partition_index))
 
-    while not reader.eof:
-        batch = protocol.record.Batch.deserialize(reader)
-        print(f"batch: {batch}")
+def _open_log(
+    topic_name: str,
+    partition_index: int,
+    create: bool = False,
+) -> typing.Optional[log.Log]:
+    key = (topic_name, partition_index)
 
-        for record in batch.records:
-            print(f"record: {batch}")
+    partition_log = _logs.get(key)
+    if partition_log is not None:
+        return partition_log
 
-            if isinstance(record, protocol.record.TopicRecord):
-                topics.append(record)
-            if isinstance(record, protocol.record.PartitionRecord):
-                partitions.append(record)
+    with _logs_lock:
+        partition_log = _logs.get(key)
+        if partition_log is not None:
+            return partition_log
 
-    return topics, partitions
+        directory = _partition_directory(topic_name, partition_index)
 
+        if create:
+            os.makedirs(directory, exist_ok=True)
 
-def _handle_fetch(request: protocol.message.FetchRequestV16):
-    topics, partitions = _read_batches()
+        try:
+            partition_log = log.Log(directory, SEGMENT_BYTES, SEGMENT_MS)
+        except FileNotFoundError:
+            return None
 
-    topic_per_uuid = {
-        topic.id: topic
-        for topic in topics
-    }
+        _logs[key] = partition_log
+        return partition_log
 
-    def by_topic_id(x): return x.topic_id
-    partitions_per_topic_id = {
-        topic_id: sorted(grouper, key=lambda x: x.id)
-        for topic_id, grouper in itertools.groupby(sorted(partitions, key=by_topic_id), by_topic_id)
-    }
 
-    responses: typing.List[protocol.message.FetchResponseResponseV16] = []
-    for topic_request in request.topics:
-        topic = topic_per_uuid.get(topic_request.topic_id)
+def _fetch_partition(
+    topic: protocol.record.TopicRecord,
+    partition_request: protocol.message.FetchRequest.FetchPartition,
+):
+    partition_log = _open_log(topic.name, partition_request.partition)
+
+    if partition_log is None:
+        return protocol.message.FetchResponse.PartitionData(
+            partition_index=partition_request.partition,
+            error_code=protocol.ErrorCode.UNKNOWN_TOPIC,
+            high_watermark=-1,
+            last_stable_offset=-1,
+            log_start_offset=-1,
+            aborted_transactions=[],
+            preferred_read_replica=-1,
+            records=None,
+        )
+
+    records = partition_log.read(
+        partition_request.fetch_offset,
+        partition_request.partition_max_bytes
+    )
+
+    return protocol.message.FetchResponse.PartitionData(
+        partition_index=partition_request.partition,
+        error_code=protocol.ErrorCode.NONE if records is not None else protocol.ErrorCode.OFFSET_OUT_OF_RANGE,
+        high_watermark=partition_log.next_offset,
+        last_stable_offset=partition_log.next_offset,
+        log_start_offset=partition_log.base_offset,
+        aborted_transactions=[],
+        preferred_read_replica=-1,
+        records=records,
+    )
+
+
+def _fetch_topic(partition: session.SessionPartition):
+    if partition.topic_name:
+        return metadata_image.topics_by_name.get(partition.topic_name)
+
+    return metadata_image.topics_by_id.get(partition.topic_id)
+
+
+def _handle_fetch(context: session.FetchContext):
+    metadata_image.refresh()
+
+    responses: typing.List[protocol.message.FetchResponse.FetchableTopicResponse] = []
+    for partition in context.partitions:
+        topic = _fetch_topic(partition)
 
         if topic is None:
-            responses.append(protocol.message.FetchResponseResponseV16(
-                topic_request.topic_id,
-                [
-                    protocol.message.FetchResponseResponsePartitionV16(
-                        partition_index=0,
-                        error_code=protocol.ErrorCode.UNKNOWN_TOPIC_ID,
-                        high_watermark=0,
-                        last_stable_offset=0,
-                        log_start_offset=0,
-                        aborted_transactions=[],
-                        preferred_read_replica=0,
-                        records=bytes(),
-                    )
-                ]
-            ))
+            partition_response = protocol.message.FetchResponse.PartitionData(
+                partition_index=partition.request.partition,
+                error_code=protocol.ErrorCode.UNKNOWN_TOPIC if partition.topic_name else protocol.ErrorCode.UNKNOWN_TOPIC_ID,
+                high_watermark=0,
+                last_stable_offset=0,
+                log_start_offset=0,
+                aborted_transactions=[],
+                preferred_read_replica=0,
+                records=bytes(),
+            )
+        else:
+            partition_response = _fetch_partition(topic, partition.request)
+
+        if context.incremental and not partition.changed(partition_response):
             continue
 
-        responses.append(protocol.message.FetchResponseResponseV16(
-            topic_request.topic_id,
-            [
-                protocol.message.FetchResponseResponsePartitionV16(
-                    partition_index=partition_request.partition,
-                    error_code=protocol.ErrorCode.NONE,
-                    high_watermark=0,
-                    last_stable_offset=0,
-                    log_start_offset=0,
-                    aborted_transactions=[],
-                    preferred_read_replica=0,
-                    records=_read_batches_bytes(topic.name, partition_request.partition),
-                )
-                for partition_request in topic_request.partitions
-            ]
-        ))
+        if not responses or (responses[-1].topic_id, responses[-1].topic) != (partition.topic_id, partition.topic_name):
+            responses.append(protocol.message.FetchResponse.FetchableTopicResponse(
+                topic=partition.topic_name,
+                topic_id=partition.topic_id,
+                partitions=[],
+            ))
 
-    return protocol.message.FetchResponseV16(
+        responses[-1].partitions.append(partition_response)
+
+    return protocol.message.FetchResponse(
         throttle_time_ms=0,
-        error_code=protocol.ErrorCode.NONE,
-        session_id=0,
+        error_code=context.error_code,
+        session_id=context.session_id,
         responses=responses,
     )
 
 
-def _handle_describe_topic_partitions(request: protocol.message.DescribeTopicPartitionsRequestV0):
-    topics, partitions = _read_batches()
+def _handle_describe_topic_partitions(request: protocol.message.DescribeTopicPartitionsRequest):
+    if request.topics:
+        topic_names = sorted({topic_request.name for topic_request in request.topics})
+    else:
+        topic_names = metadata_image.topic_names()
 
-    topic_per_name = {
-        topic.name: topic
-        for topic in topics
-    }
+    cursor = request.cursor
+    if cursor is not None:
+        topic_names = topic_names[bisect.bisect_left(topic_names, cursor.topic_name):]
 
-    def by_topic_id(x): return x.topic_id
-    partitions_per_topic_id = {
-        topic_id: sorted(grouper, key=lambda x: x.id)
-        for topic_id, grouper in itertools.groupby(sorted(partitions, key=by_topic_id), by_topic_id)
-    }
+    remaining = DESCRIBE_TOPIC_PARTITIONS_LIMIT
+    if request.response_partition_limit > 0:
+        remaining = min(request.response_partition_limit, remaining)
+    next_cursor = None
 
     topic_responses = []
-    for topic_request in request.topics:
-        topic = topic_per_name.get(topic_request.name)
+    for topic_name in topic_names:
+        if remaining <= 0:
+            next_cursor = protocol.message.DescribeTopicPartitionsResponse.Cursor(topic_name, 0)
+            break
+
+        topic = metadata_image.topics_by_name.get(topic_name)
 
         if topic is None:
-            topic_responses.append(protocol.message.DescribeTopicPartitionsTopicResponseV0(
+            topic_responses.append(protocol.message.DescribeTopicPartitionsResponse.DescribeTopicPartitionsResponseTopic(
                 error_code=protocol.ErrorCode.UNKNOWN_TOPIC,
-                name=topic_request.name,
+                name=topic_name,
                 topic_id=uuid.UUID("00000000-0000-0000-0000-000000000000"),
                 is_internal=False,
                 partitions=[],
@@ -134,9 +217,18 @@ def _handle_describe_topic_partitions(request: protocol.message.DescribeTopicPar
             ))
             continue
 
+        start = cursor.partition_index if cursor is not None and cursor.topic_name == topic_name else 0
+        partitions = metadata_image.partitions(topic.id, start, remaining + 1)
+
+        if len(partitions) > remaining:
+            next_cursor = protocol.message.DescribeTopicPartitionsResponse.Cursor(topic_name, partitions[remaining].id)
+            partitions = partitions[:remaining]
+
+        remaining -= len(partitions)
+
         partition_responses = []
-        for partition in partitions_per_topic_id.get(topic.id, []):
-            partition_responses.append(protocol.message.DescribeTopicPartitionsTopicPartitionResponseV0(
+        for partition in partitions:
+            partition_responses.append(protocol.message.DescribeTopicPartitionsResponse.DescribeTopicPartitionsResponsePartition(
                 error_code=protocol.ErrorCode.NONE,
                 partition_index=partition.id,
                 leader_id=partition.leader,
@@ -148,82 +240,654 @@ def _handle_describe_topic_partitions(request: protocol.message.DescribeTopicPar
                 offline_replicas=partition.removing_replicas,
             ))
 
-        topic_responses.append(protocol.message.DescribeTopicPartitionsTopicResponseV0(
+        topic_responses.append(protocol.message.DescribeTopicPartitionsResponse.DescribeTopicPartitionsResponseTopic(
             error_code=protocol.ErrorCode.NONE,
-            name=topic_request.name,
+            name=topic_name,
             topic_id=topic.id,
             is_internal=False,
             partitions=partition_responses,
             topic_authorized_operations=0,
         ))
 
-    return protocol.message.DescribeTopicPartitionsResponseV0(
+        if next_cursor is not None:
+            break
+
+    return protocol.message.DescribeTopicPartitionsResponse(
         throttle_time_ms=0,
         topics=topic_responses,
-        next_cursor=None,
+        next_cursor=next_cursor,
     )
 
 
-def handle(
-    client_id: int,
-    client_socket: socket.socket,
+def _handle_list_offsets_partition(
+    topic: protocol.record.TopicRecord,
+    partition_request: protocol.message.ListOffsetsRequest.ListOffsetsPartition,
 ):
-    message_reader = protocol.MessageReader(client_socket)
-    message_writer = protocol.MessageWriter(client_socket)
+    def respond(
+        error_code: protocol.ErrorCode,
+        timestamp: int = -1,
+        offset: int = -1,
+    ):
+        return protocol.message.ListOffsetsResponse.ListOffsetsPartitionResponse(
+            partition_index=partition_request.partition_index,
+            error_code=error_code,
+            timestamp=timestamp,
+            offset=offset,
+            leader_epoch=-1,
+        )
+
+    partition_log = _open_log(topic.name, partition_request.partition_index)
+    if partition_log is None:
+        return respond(protocol.ErrorCode.UNKNOWN_TOPIC)
+
+    timestamp = partition_request.timestamp
+
+    if timestamp in (EARLIEST_TIMESTAMP, EARLIEST_LOCAL_TIMESTAMP):
+        return respond(protocol.ErrorCode.NONE, offset=partition_log.base_offset)
+
+    if timestamp in (LATEST_TIMESTAMP, LATEST_TIERED_TIMESTAMP):
+        partition_log.refresh()
+        return respond(protocol.ErrorCode.NONE, offset=partition_log.next_offset)
+
+    if timestamp == MAX_TIMESTAMP:
+        found = partition_log.find_max_timestamp()
+    else:
+        found = partition_log.find_offset_by_timestamp(timestamp)
+
+    if found is None:
+        return respond(protocol.ErrorCode.NONE)
+
+    timestamp, offset = found
+    return respond(protocol.ErrorCode.NONE, timestamp, offset)
+
+
+def _handle_list_offsets(request: protocol.message.ListOffsetsRequest):
+    metadata_image.refresh()
+
+    topic_responses = []
+    for topic_request in request.topics:
+        topic = metadata_image.topics_by_name.get(topic_request.name)
+
+        if topic is None:
+            partition_responses = [
+                protocol.message.ListOffsetsResponse.ListOffsetsPartitionResponse(
+                    partition_index=partition_request.partition_index,
+                    error_code=protocol.ErrorCode.UNKNOWN_TOPIC,
+                    timestamp=-1,
+                    offset=-1,
+                    leader_epoch=-1,
+                )
+                for partition_request in topic_request.partitions
+            ]
+        else:
+            partition_responses = [
+                _handle_list_offsets_partition(topic, partition_request)
+                for partition_request in topic_request.partitions
+            ]
+
+        topic_responses.append(protocol.message.ListOffsetsResponse.ListOffsetsTopicResponse(
+            name=topic_request.name,
+            partitions=partition_responses,
+        ))
+
+    return protocol.message.ListOffsetsResponse(
+        throttle_time_ms=0,
+        topics=topic_responses,
+    )
+
+
+def _produce_partition(
+    topic: protocol.record.TopicRecord,
+    partition_request: protocol.message.ProduceRequest.PartitionProduceData,
+    acks: int,
+    pending: "_PendingFlushes",
+):
+    def respond(
+        error_code: protocol.ErrorCode,
+        base_offset: int = -1,
+        log_start_offset: int = -1,
+        error_message: typing.Optional[str] = None,
+    ):
+        return protocol.message.ProduceResponse.PartitionProduceResponse(
+            index=partition_request.index,
+            error_code=error_code,
+            base_offset=base_offset,
+            log_append_time_ms=-1,
+            log_start_offset=log_start_offset,
+            record_errors=[],
+            error_message=error_message,
+        )
+
+    if partition_request.index not in metadata_image.partitions_by_topic_id.get(topic.id, {}):
+        return respond(protocol.ErrorCode.UNKNOWN_TOPIC)
+
+    partition_log = _open_log(topic.name, partition_request.index, create=True)
 
     try:
-        request = message_reader.next()
-        correlation_id = request.header.correlation_id
+        base_offset, next_offset = partition_log.append(partition_request.records or b"")
+    except log.InvalidRecordError as error:
+        return respond(protocol.ErrorCode.CORRUPT_MESSAGE, error_message=str(error))
 
-        print(request)
+    response = respond(protocol.ErrorCode.NONE, base_offset, partition_log.base_offset)
+    fetch_purgatory.notify((topic.name, partition_request.index))
 
-        if isinstance(request.body, protocol.message.ApiVersionsRequestV4):
-            response = protocol.message.Response(
-                protocol.message.ResponseHeaderV0(correlation_id),
-                protocol.message.ApiVersionsResponseV4(
-                    error_code=protocol.ErrorCode.NONE,
-                    api_keys=[
-                        protocol.message.ApiVersionsResponseKeyV4(
-                            api_key,
-                            version,
-                            version
-                        )
-                        for api_key, version in message_reader.DESERIALIZERS.keys()
-                    ],
-                    throttle_time_ms=0
+    durable = log_flusher.track(partition_log, next_offset - base_offset, wait=acks == -1)
+    if durable is not None:
+        pending.append((response, durable))
+
+    return response
+
+
+def _handle_produce(
+    request: protocol.message.ProduceRequest,
+    pending: "_PendingFlushes",
+):
+    metadata_image.refresh()
+
+    topic_responses = []
+    for topic_request in request.topic_data:
+        topic = metadata_image.topics_by_name.get(topic_request.name)
+
+        if topic is None:
+            partition_responses = [
+                protocol.message.ProduceResponse.PartitionProduceResponse(
+                    index=partition_request.index,
+                    error_code=protocol.ErrorCode.UNKNOWN_TOPIC,
+                    base_offset=-1,
+                    log_append_time_ms=-1,
+                    log_start_offset=-1,
+                    record_errors=[],
+                    error_message=None,
                 )
-            )
-        elif isinstance(request.body, protocol.message.FetchRequestV16):
-            response = protocol.message.Response(
-                protocol.message.ResponseHeaderV1(correlation_id),
-                _handle_fetch(request.body),
-            )
-        elif isinstance(request.body, protocol.message.DescribeTopicPartitionsRequestV0):
-            response = protocol.message.Response(
-                protocol.message.ResponseHeaderV1(correlation_id),
-                _handle_describe_topic_partitions(request.body),
-            )
+                for partition_request in topic_request.partition_data
+            ]
         else:
-            raise protocol.ProtocolError(
-                protocol.ErrorCode.UNSUPPORTED_VERSION,
-                correlation_id=correlation_id
-            )
+            partition_responses = [
+                _produce_partition(topic, partition_request, request.acks, pending)
+                for partition_request in topic_request.partition_data
+            ]
+
+        topic_responses.append(protocol.message.ProduceResponse.TopicProduceResponse(
+            name=topic_request.name,
+            partition_responses=partition_responses,
+        ))
+
+    return protocol.message.ProduceResponse(
+        responses=topic_responses,
+        throttle_time_ms=0,
+    )
+
+
+def _process_produce(request: protocol.message.Request):
+    pending: _PendingFlushes = []
+
+    response = protocol.message.Response(
+        _response_header(request, protocol.message.ProduceResponse),
+        _handle_produce(request.body, pending),
+        request.header.request_api_version,
+    )
+
+    if request.body.acks == 0:
+        return None, pending
+
+    return response, pending
+
+
+def _complete_produce(pending: "_PendingFlushes"):
+    for partition_response, durable in pending:
+        if durable.exception() is not None:
+            partition_response.error_code = protocol.ErrorCode.KAFKA_STORAGE_ERROR
+
+
+def _response_header(
+    request: protocol.message.Request,
+    response_type: typing.Type[protocol.message.ResponseBody],
+):
+    if request.header.request_api_version in response_type.FLEXIBLE_VERSIONS:
+        return protocol.message.ResponseHeaderV1(request.header.correlation_id)
+
+    return protocol.message.ResponseHeaderV0(request.header.correlation_id)
+
+
+def _supported_api_versions():
+    versions: typing.Dict[int, typing.List[int]] = {}
+
+    for api_key, version in protocol.MessageReader.DESERIALIZERS.keys():
+        versions.setdefault(api_key, []).append(version)
+
+    return [
+        protocol.message.ApiVersionsResponse.ApiVersion(
+            api_key,
+            min(api_versions),
+            max(api_versions)
+        )
+        for api_key, api_versions in versions.items()
+    ]
+
+
+def _handle_metadata(request: protocol.message.MetadataRequest, version: int):
+    topics_by_name, topics_by_id = _metadata_topics()
+
+    if request.topics is None or (version == 0 and not request.topics):
+        topics = list(topics_by_name.values())
+    else:
+        topics = []
+        for topic_request in request.topics:
+            if topic_request.name is not None:
+                topic = topics_by_name.get(topic_request.name)
+                if topic is None:
+                    topic = protocol.message.MetadataResponse.MetadataResponseTopic(
+                        error_code=protocol.ErrorCode.UNKNOWN_TOPIC,
+                        name=topic_request.name,
+                    )
+            else:
+                topic = topics_by_id.get(topic_request.topic_id)
+                if topic is None:
+                    topic = protocol.message.MetadataResponse.MetadataResponseTopic(
+                        error_code=protocol.ErrorCode.UNKNOWN_TOPIC_ID,
+                        name=None,
+                        topic_id=topic_request.topic_id,
+                    )
+
+            topics.append(topic)
+
+    return protocol.message.MetadataResponse(
+        throttle_time_ms=0,
+        brokers=[
+            protocol.message.MetadataResponse.MetadataResponseBroker(
+                node_id=NODE_ID,
+                host=ADVERTISED_HOST,
+                port=PORT,
+            ),
+        ],
+        cluster_id=_cluster_id(),
+        controller_id=NODE_ID,
+        topics=topics,
+    )
+
+
+def _metadata_topics() -> _MetadataTopicTables:
+    global _metadata_topic_tables
+
+    epoch, tables = _metadata_topic_tables
+    if epoch == metadata_image.epoch:
+        return tables
+
+    epoch = metadata_image.epoch
+
+    topics_by_name = {}
+    topics_by_id = {}
+    for topic_name in metadata_image.topic_names():
+        topic = metadata_image.topics_by_name[topic_name]
+
+        topic_response = protocol.message.MetadataResponse.MetadataResponseTopic(
+            error_code=protocol.ErrorCode.NONE,
+            name=topic.name,
+            topic_id=topic.id,
+            is_internal=False,
+            partitions=[
+                protocol.message.MetadataResponse.MetadataResponsePartition(
+                    error_code=protocol.ErrorCode.NONE,
+                    partition_index=partition.id,
+                    leader_id=partition.leader,
+                    leader_epoch=partition.leader_epoch,
+                    replica_nodes=partition.replicas,
+                    isr_nodes=partition.in_sync_replicas,
+                    offline_replicas=[],
+                )
+                for partition in metadata_image.partitions(topic.id)
+            ],
+        )
+
+        topics_by_name[topic.name] = topic_response
+        topics_by_id[topic.id] = topic_response
+
+    tables = (topics_by_name, topics_by_id)
+    _metadata_topic_tables = (epoch, tables)
+
+    return tables
+
+
+@functools.lru_cache(maxsize=None)
+def _cluster_id() -> typing.Optional[str]:
+    cluster_id = os.environ.get("KAFKA_CLUSTER_ID")
+    if cluster_id is not None:
+        return cluster_id
+
+    try:
+        with open(os.path.join(LOG_DIRECTORY, "meta.properties")) as fd:
+            for line in fd:
+                key, _, value = line.strip().partition("=")
+                if key == "cluster.id":
+                    return value
+    except FileNotFoundError:
+        pass
+
+    return None
+
+
+def _cached_response(
+    request: protocol.message.Request,
+    body_key: typing.Hashable,
+    build: typing.Callable[[], protocol.message.Response],
+):
+    key = (request.header.request_api_key, request.header.request_api_version, body_key)
+    epoch = metadata_image.epoch
+
+    data = response_cache.get(key, epoch)
+    if data is None:
+        encoded = protocol.message.EncodedResponse.of(build())
+        response_cache.put(key, epoch, encoded.data)
+
+        return encoded
+
+    return protocol.message.EncodedResponse(request.header.correlation_id, data)
+
+
+def _describe_topic_partitions_key(request: protocol.message.DescribeTopicPartitionsRequest):
+    cursor = request.cursor
+
+    return (
+        tuple(topic.name for topic in request.topics),
+        request.response_partition_limit,
+        None if cursor is None else (cursor.topic_name, cursor.partition_index),
+    )
+
+
+def _metadata_key(request: protocol.message.MetadataRequest):
+    if request.topics is None:
+        return None
+
+    return tuple((topic.topic_id, topic.name) for topic in request.topics)
+
+
+def process(request: protocol.message.Request) -> typing.Optional[protocol.message.Response]:
+    correlation_id = request.header.correlation_id
+
+    if isinstance(request.body, protocol.message.ProduceRequest):
+        response, pending = _process_produce(request)
+
+        concurrent.futures.wait([durable for _, durable in pending])
+        _complete_produce(pending)
+
+        return response
+
+    if isinstance(request.body, protocol.message.ApiVersionsRequest):
+        return _cached_response(request, None, lambda: protocol.message.Response(
+            protocol.message.ResponseHeaderV0(correlation_id),
+            protocol.message.ApiVersionsResponse(
+                error_code=protocol.ErrorCode.NONE,
+                api_keys=_supported_api_versions(),
+                throttle_time_ms=0
+            ),
+            request.header.request_api_version,
+        ))
+
+    if isinstance(request.body, protocol.message.FetchRequest):
+        context = fetch_sessions.open(request.body)
+
+        response = _handle_fetch(context)
+        fetch_sessions.complete(context, response)
+
+        return protocol.message.Response(
+            _response_header(request, protocol.message.FetchResponse),
+            response,
+            request.header.request_api_version,
+        )
+
+    if isinstance(request.body, protocol.message.ListOffsetsRequest):
+        return protocol.message.Response(
+            _response_header(request, protocol.message.ListOffsetsResponse),
+            _handle_list_offsets(request.body),
+            request.header.request_api_version,
+        )
+
+    if isinstance(request.body, protocol.message.MetadataRequest):
+        metadata_image.refresh()
+
+        version = request.header.request_api_version
+
+        return _cached_response(request, _metadata_key(request.body), lambda: protocol.message.Response(
+            _response_header(request, protocol.message.MetadataResponse),
+            _handle_metadata(request.body, version),
+            version,
+        ))
+
+    if isinstance(request.body, protocol.message.DescribeTopicPartitionsRequest):
+        metadata_image.refresh()
+
+        return _cached_response(request, _describe_topic_partitions_key(request.body), lambda: protocol.message.Response(
+            protocol.message.ResponseHeaderV1(correlation_id),
+            _handle_describe_topic_partitions(request.body),
+            request.header.request_api_version,
+        ))
+
+    raise protocol.ProtocolError(
+        protocol.ErrorCode.UNSUPPORTED_VERSION,
+        correlation_id=correlation_id
+    )
+
+
+def handle(
+    client_id: int,
+    message_reader: protocol.MessageReader,
+    message_writer: protocol.MessageWriter,
+):
+    try:
+        request = message_reader.next()
+        print(request)
+
+        response = process(request)
 
         print(response)
-        message_writer.send(response)
+        if response is not None:
+            message_writer.queue(response)
     except protocol.ProtocolError as error:
         print(f"[{client_id}] error: {error}")
 
-        message_writer.send_error(
+        message_writer.queue_error(
             error.correlation_id,
             error.error_code
         )
 
+    if not message_reader.ready:
+        message_writer.flush()
+
     return True
 
 
-def main():
-    print(f"listen: {PORT}")
+async def process_async(
+    request: protocol.message.Request,
+    appends: asyncio.Lock,
+) -> typing.Optional[protocol.message.Response]:
+    loop = asyncio.get_running_loop()
+    produce = isinstance(request.body, protocol.message.ProduceRequest)
+
+    # Requests take the connection's lock in the order they arrived. Produces
+    # hold it while appending, so they land in request order and every later
+    # request sees them. Reads only pass through it and still overlap.
+    async with appends:
+        if produce:
+            response, pending = await loop.run_in_executor(None, _process_produce, request)
+
+    if produce:
+        if pending:
+            await asyncio.wait([asyncio.wrap_future(durable) for _, durable in pending])
+
+        _complete_produce(pending)
+
+        return response
+
+    if isinstance(request.body, protocol.message.FetchRequest):
+        return await _process_fetch_async(request)
+
+    return await loop.run_in_executor(None, process, request)
+
+
+def _fetch_satisfied(
+    request: protocol.message.FetchRequest,
+    response: protocol.message.FetchResponse,
+):
+    if response.error_code != protocol.ErrorCode.NONE:
+        return True
+
+    size = 0
+    for topic_response in response.responses:
+        for partition_response in topic_response.partitions:
+            if partition_response.error_code != protocol.ErrorCode.NONE:
+                return True
+
+            if partition_response.records is not None:
+                size += len(partition_response.records)
+
+    return size >= request.min_bytes
+
+
+def _fetch_keys(context: session.FetchContext):
+    keys = []
+
+    for partition in context.partitions:
+        topic = _fetch_topic(partition)
+
+        if topic is not None:
+            keys.append((topic.name, partition.request.partition))
+
+    return keys
+
+
+async def _process_fetch_async(request: protocol.message.Request):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + request.body.max_wait_ms / 1000
+
+    context = fetch_sessions.open(request.body)
+
+    while True:
+        watcher = fetch_purgatory.watch(_fetch_keys(context))
+
+        try:
+            body = await loop.run_in_executor(None, _handle_fetch, context)
+
+            timeout = deadline - loop.time()
+            if timeout <= 0 or _fetch_satisfied(request.body, body):
+                break
+
+            if not await fetch_purgatory.wait(watcher, timeout):
+                body = await loop.run_in_executor(None, _handle_fetch, context)
+                break
+        finally:
+            watcher.cancel()
+
+    fetch_sessions.complete(context, body)
+
+    return protocol.message.Response(
+        _response_header(request, protocol.message.FetchResponse),
+        body,
+        request.header.request_api_version,
+    )
+
+
+async def _receive_requests(
+    client_id: int,
+    message_reader: protocol.AsyncMessageReader,
+    responses: "asyncio.Queue[typing.Optional[asyncio.Future]]",
+    in_flight: asyncio.Semaphore,
+):
+    loop = asyncio.get_running_loop()
+    appends = asyncio.Lock()
+
+    try:
+        while True:
+            await in_flight.acquire()
+
+            try:
+                request = await message_reader.next()
+            except protocol.ProtocolError as error:
+                response = loop.create_future()
+                response.set_exception(error)
+            else:
+                response = asyncio.ensure_future(process_async(request, appends))
+
+            responses.put_nowait(response)
+    except EOFError as error:
+        print(f"[{client_id}] eof: {error}")
+    finally:
+        responses.put_nowait(None)
+
+
+async def _write_response(
+    client_id: int,
+    message_writer: protocol.AsyncMessageWriter,
+    response: asyncio.Future,
+):
+    try:
+        response = await response
+
+        if response is not None:
+            message_writer.queue(response)
+    except protocol.ProtocolError as error:
+        print(f"[{client_id}] error: {error}")
+
+        message_writer.queue_error(
+            error.correlation_id,
+            error.error_code
+        )
+
+
+async def _send_responses(
+    client_id: int,
+    message_writer: protocol.AsyncMessageWriter,
+    responses: "asyncio.Queue[typing.Optional[asyncio.Future]]",
+    in_flight: asyncio.Semaphore,
+):
+    try:
+        response = await responses.get()
+
+        while response is not None:
+            await _write_response(client_id, message_writer, response)
+            in_flight.release()
+
+            if responses.empty():
+                await message_writer.flush()
+                response = await responses.get()
+                continue
+
+            response = responses.get_nowait()
+            if response is not None and not response.done():
+                await message_writer.flush()
+
+        await message_writer.flush()
+    finally:
+        while not responses.empty():
+            response = responses.get_nowait()
+            if response is not None:
+                response.cancel()
+
+
+async def handle_async(
+    client_id: int,
+    message_reader: protocol.AsyncMessageReader,
+    message_writer: protocol.AsyncMessageWriter,
+):
+    in_flight = asyncio.Semaphore(PIPELINE_DEPTH)
+    responses: "asyncio.Queue[typing.Optional[asyncio.Future]]" = asyncio.Queue()
+
+    receiver = asyncio.create_task(_receive_requests(client_id, message_reader, responses, in_flight))
+    sender = asyncio.create_task(_send_responses(client_id, message_writer, responses, in_flight))
+
+    try:
+        done, _ = await asyncio.wait(
+            (receiver, sender),
+            return_when=asyncio.FIRST_EXCEPTION
+        )
+    finally:
+        receiver.cancel()
+        sender.cancel()
+
+    for task in done:
+        task.result()
+
+
+def serve_fork():
     server_socket = socket.create_server(("localhost", PORT), reuse_port=True)
 
     client_id = 0
@@ -238,11 +902,15 @@ def main():
             print(f"[{client_id}] connected: {client_address}")
 
         else:
+            message_reader = protocol.MessageReader(client_socket)
+            message_writer = protocol.MessageWriter(client_socket)
+
             try:
                 while True:
                     handle(
                         client_id,
-                        client_socket
+                        message_reader,
+                        message_writer
                     )
             except EOFError as error:
                 print(f"[{client_id}] eof: {error}")
@@ -251,6 +919,118 @@ def main():
             exit(0)
 
 
+async def serve_asyncio(worker: typing.Optional[typing.Tuple[int, int, int]] = None):
+    client_ids = itertools.count(1)
+
+    if worker is None:
+        fetch_purgatory.attach(asyncio.get_running_loop())
+    else:
+        group, index, worker_count = worker
+
+        fetch_purgatory.attach(
+            asyncio.get_running_loop(),
+            purgatory.address(group, index),
+            [
+                purgatory.address(group, peer)
+                for peer in range(worker_count)
+                if peer != index
+            ]
+        )
+
+    async def on_connection(
+        message_reader: protocol.AsyncMessageReader,
+        message_writer: protocol.AsyncMessageWriter,
+    ):
+        client_id = next(client_ids)
+        print(f"[{client_id}] connected: {message_writer.get_extra_info('peername')}")
+
+        try:
+            await handle_async(
+                client_id,
+                message_reader,
+                message_writer
+            )
+        except (EOFError, ConnectionError) as error:
+            print(f"[{client_id}] connection error: {error}")
+        finally:
+            message_writer.close()
+
+    server = await protocol.start_server(
+        on_connection,
+        "localhost",
+        PORT,
+        reuse_port=True,
+        backlog=BACKLOG,
+    )
+
+    async with server:
+        await server.serve_forever()
+
+
+def serve_prefork(worker_count: int):
+    group = os.getpid()
+    workers: typing.Dict[int, typing.Tuple[int, float]] = {}
+
+    def spawn(index: int):
+        pid = os.fork()
+        if pid:
+            workers[pid] = (index, time.monotonic())
+            print(f"worker {index} started: {pid}")
+            return
+
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+        try:
+            asyncio.run(serve_asyncio((group, index, worker_count)))
+        finally:
+            os._exit(1)
+
+    def stop(signum, frame):
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        exit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for index in range(worker_count):
+        spawn(index)
+
+    while True:
+        pid, status = os.wait()
+
+        index, started_at = workers.pop(pid, (None, None))
+        if index is None:
+            continue
+
+        print(f"worker {index} died: {pid} (status={status})")
+
+        if time.monotonic() - started_at < WORKER_RESTART_DELAY:
+            time.sleep(WORKER_RESTART_DELAY)
+
+        spawn(index)
+
+
+def main():
+    print(f"listen: {PORT} ({MODE})")
+
+    metadata_image.refresh()
+
+    if MODE == "fork":
+        serve_fork()
+    elif MODE == "asyncio":
+        asyncio.run(serve_asyncio())
+    elif MODE == "prefork":
+        serve_prefork(WORKERS)
+    else:
+        raise ValueError(f"unknown server mode: {MODE}")
+
+
 if __name__ == "__main__":
     # os.system("find /tmp/kraft-combined-logs")
     main()
@@ -0,0 +1,151 @@
+import bisect
+import os
+import struct
+import threading
+import typing
+import uuid
+
+from . import buffer, log
+from .protocol import record
+
+BATCH_SIZE = struct.Struct("!qi")
+
+
+class MetadataImage:
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = log.segment_path(directory, 0, ".log")
+
+        self.topics_by_name: typing.Dict[str, record.TopicRecord] = {}
+        self.topics_by_id: typing.Dict[uuid.UUID, record.TopicRecord] = {}
+        self.partitions_by_topic_id: typing.Dict[uuid.UUID, typing.Dict[int, record.PartitionRecord]] = {}
+        self.features: typing.Dict[str, int] = {}
+
+        self.last_offset = -1
+        self.position = 0
+        self.epoch = 0
+
+        self._sorted_topic_names: typing.Optional[typing.List[str]] = None
+        self._sorted_partitions: typing.Dict[uuid.UUID, typing.List[record.PartitionRecord]] = {}
+        self._lock = threading.Lock()
+
+    def topic_names(self) -> typing.List[str]:
+        names = self._sorted_topic_names
+        if names is not None:
+            return names
+
+        with self._lock:
+            if self._sorted_topic_names is None:
+                self._sorted_topic_names = sorted(self.topics_by_name)
+
+            return self._sorted_topic_names
+
+    def partitions(
+        self,
+        topic_id: uuid.UUID,
+        start: int = 0,
+        count: typing.Optional[int] = None,
+    ) -> typing.List[record.PartitionRecord]:
+        partitions = self._sorted_partitions.get(topic_id)
+
+        if partitions is None:
+            with self._lock:
+                partitions = self._sorted_partitions.get(topic_id)
+
+                if partitions is None:
+                    partitions = sorted(
+                        self.partitions_by_topic_id.get(topic_id, {}).values(),
+                        key=lambda x: x.id
+                    )
+
+                    self._sorted_partitions[topic_id] = partitions
+
+        if not start and count is None:
+            return partitions
+
+        index = bisect.bisect_left(partitions, start, key=lambda x: x.id)
+        return partitions[index:None if count is None else index + count]
+
+    def refresh(self):
+        try:
+            size = os.stat(self.path).st_size
+        except FileNotFoundError:
+            return self._open_first_segment()
+
+        if size == self.position and not self._rolled():
+            return
+
+        with self._lock:
+            while True:
+                size = os.stat(self.path).st_size
+
+                if size != self.position:
+                    with open(self.path, "rb") as fd:
+                        fd.seek(self.position)
+                        data = fd.read(size - self.position)
+
+                    self.position += self._apply_batches(data)
+
+                if self.position != size or not self._rolled():
+                    return
+
+                self.path = self._next_path()
+                self.position = 0
+
+    def _open_first_segment(self):
+        try:
+            names = sorted(name for name in os.listdir(self.directory) if name.endswith(".log"))
+        except FileNotFoundError:
+            return
+
+        if not names or self.position or self.last_offset != -1:
+            return
+
+        self.path = os.path.join(self.directory, names[0])
+        self.refresh()
+
+    def _next_path(self):
+        return log.segment_path(self.directory, self.last_offset + 1, ".log")
+
+    def _rolled(self):
+        next_path = self._next_path()
+        return next_path != self.path and os.path.exists(next_path)
+
+    def _apply_batches(self, data: bytes):
+        view = memoryview(data)
+        consumed = 0
+
+        while len(data) - consumed >= BATCH_SIZE.size:
+            _, batch_length = BATCH_SIZE.unpack_from(data, consumed)
+
+            batch_size = record.LOG_OVERHEAD + batch_length
+            if consumed + batch_size > len(data):
+                break
+
+            batch = record.Batch.deserialize(buffer.ByteReader(view[consumed:consumed + batch_size]))
+
+            for item in batch.records:
+                metadata_record = record.MetadataRecord.decode(item.value)
+                if metadata_record is not None:
+                    self._apply(metadata_record)
+
+            self.last_offset = batch.last_offset
+            self.epoch += 1
+            consumed += batch_size
+
+        return consumed
+
+    def _apply(self, item: record.MetadataRecord):
+        if isinstance(item, record.TopicRecord):
+            self.topics_by_name[item.name] = item
+            self.topics_by_id[item.id] = item
+            self.partitions_by_topic_id.setdefault(item.id, {})
+            self._sorted_topic_names = None
+
+        elif isinstance(item, record.PartitionRecord):
+            self.partitions_by_topic_id.setdefault(item.topic_id, {})[item.id] = item
+            self._sorted_partitions.pop(item.topic_id, None)
+
+        elif isinstance(item, record.FeatureLevelRecord):
+            self.features[item.name] = item.feature_level
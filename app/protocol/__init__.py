@@ -1,3 +1,3 @@
 from . import message, record
 from .error import ErrorCode
-from .protocol import MessageReader, MessageWriter, ProtocolError
+from .protocol import AsyncMessageReader, AsyncMessageWriter, MessageReader, MessageWriter, ProtocolError, start_server
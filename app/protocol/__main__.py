@@ -0,0 +1,6 @@
+import sys
+
+from . import codegen
+
+for name in sys.argv[1:]:
+    print(codegen.generate(codegen.load(name)))
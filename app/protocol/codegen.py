@@ -0,0 +1,598 @@
+import dataclasses
+import functools
+import json
+import linecache
+import os
+import re
+import struct
+import typing
+import uuid
+
+from .. import buffer
+from .message.base import RequestBody, ResponseBody
+
+SCHEMA_DIRECTORY = os.path.join(os.path.dirname(__file__), "schema")
+MAX_VERSION = 2 ** 15 - 1
+
+FIXED_FORMATS = {
+    "bool": "?",
+    "int8": "b",
+    "int16": "h",
+    "uint16": "H",
+    "int32": "i",
+    "int64": "q",
+    "float64": "d",
+    "uuid": "16s",
+}
+
+VARIABLE_TYPES = ("string", "bytes", "records")
+
+ZERO_UUID = uuid.UUID(int=0)
+MISSING = object()
+
+
+@dataclasses.dataclass(frozen=True)
+class Versions:
+    lowest: int
+    highest: int
+
+    def __contains__(self, version: int):
+        return self.lowest <= version <= self.highest
+
+    def __iter__(self):
+        return iter(range(self.lowest, self.highest + 1))
+
+    @staticmethod
+    def parse(text: typing.Optional[str], default: "Versions"):
+        if text is None:
+            return default
+
+        if text == "none":
+            return NO_VERSIONS
+
+        if text.endswith("+"):
+            return Versions(int(text[:-1]), MAX_VERSION)
+
+        if "-" in text:
+            lowest, highest = text.split("-")
+            return Versions(int(lowest), int(highest))
+
+        return Versions(int(text), int(text))
+
+
+NO_VERSIONS = Versions(0, -1)
+
+
+@dataclasses.dataclass
+class Field:
+    name: str
+    type: str
+    versions: Versions
+    nullable_versions: Versions
+    tagged_versions: Versions
+    tag: typing.Optional[int]
+    default: typing.Optional[str]
+
+    @property
+    def attribute(self):
+        return _snake_case(self.name)
+
+    @property
+    def array(self):
+        return self.type.startswith("[]")
+
+    @property
+    def element_type(self):
+        return self.type[2:] if self.array else self.type
+
+    @property
+    def fixed(self):
+        return not self.array and self.type in FIXED_FORMATS
+
+    @property
+    def struct(self):
+        return self.element_type not in FIXED_FORMATS and self.element_type not in VARIABLE_TYPES
+
+    def tagged(self, version: int):
+        return self.tag is not None and version in self.tagged_versions
+
+
+@dataclasses.dataclass
+class Struct:
+    name: str
+    fields: typing.List[Field]
+
+
+@dataclasses.dataclass
+class Message:
+    name: str
+    api_key: int
+    type: str
+    valid_versions: Versions
+    flexible_versions: Versions
+    root: Struct
+    structs: typing.Dict[str, Struct]
+
+
+def load(name: str, directory: str = SCHEMA_DIRECTORY) -> Message:
+    with open(os.path.join(directory, f"{name}.json")) as fd:
+        spec = json.loads(re.sub(r"^\s*//.*$", "", fd.read(), flags=re.MULTILINE))
+
+    structs: typing.Dict[str, Struct] = {}
+
+    def parse_fields(specs: typing.List[dict]):
+        fields = []
+
+        for field_spec in specs:
+            versions = Versions.parse(field_spec["versions"], NO_VERSIONS)
+            field = Field(
+                name=field_spec["name"],
+                type=field_spec["type"],
+                versions=versions,
+                nullable_versions=Versions.parse(field_spec.get("nullableVersions"), NO_VERSIONS),
+                tagged_versions=Versions.parse(field_spec.get("taggedVersions"), versions),
+                tag=field_spec.get("tag"),
+                default=field_spec.get("default"),
+            )
+
+            if "fields" in field_spec:
+                structs[field.element_type] = Struct(field.element_type, parse_fields(field_spec["fields"]))
+
+            fields.append(field)
+
+        return fields
+
+    for struct_spec in spec.get("commonStructs", ()):
+        structs[struct_spec["name"]] = Struct(struct_spec["name"], parse_fields(struct_spec["fields"]))
+
+    root = Struct(spec["name"], parse_fields(spec["fields"]))
+
+    return Message(
+        name=spec["name"],
+        api_key=spec["apiKey"],
+        type=spec["type"],
+        valid_versions=Versions.parse(spec["validVersions"], NO_VERSIONS),
+        flexible_versions=Versions.parse(spec["flexibleVersions"], NO_VERSIONS),
+        root=root,
+        structs=structs,
+    )
+
+
+def generate(message: Message) -> str:
+    return _Generator(message).generate()
+
+
+def build(name: str, module: str):
+    message = load(name)
+    source = generate(message)
+
+    filename = f"<codegen {message.name}>"
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+
+    namespace = {
+        "__name__": module,
+        "buffer": buffer,
+        "struct": struct,
+        "uuid": uuid,
+        "RequestBody": RequestBody,
+        "ResponseBody": ResponseBody,
+        "ZERO_UUID": ZERO_UUID,
+        "MISSING": MISSING,
+        "_array_struct": _array_struct,
+    }
+
+    exec(compile(source, filename, "exec"), namespace)
+    return namespace[message.name]
+
+
+@functools.lru_cache(maxsize=None)
+def _array_struct(format: str, count: int):
+    return struct.Struct(f"!{count}{format}")
+
+
+def _snake_case(name: str):
+    return re.sub(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])", "_", name).lower()
+
+
+class _Generator:
+
+    def __init__(self, message: Message):
+        self.message = message
+        self.formats: typing.Dict[str, str] = {}
+        self.defaults: typing.Dict[str, str] = {}
+
+    def generate(self):
+        body = []
+
+        usages = self._usages()
+        for struct_ in [*self.message.structs.values(), self.message.root]:
+            body.extend(self._class(struct_))
+
+            for version in usages.get(struct_.name, ()):
+                body.extend(self._reader(struct_, version))
+                body.extend(self._writer(struct_, version))
+
+        name = self.message.name
+        body.extend([
+            f"_READERS = {{{', '.join(f'{version}: _read_{name}_v{version}' for version in self.message.valid_versions)}}}",
+            f"_WRITERS = {{{', '.join(f'{version}: _write_{name}_v{version}' for version in self.message.valid_versions)}}}",
+            "",
+        ])
+
+        for struct_ in self.message.structs.values():
+            body.append(f"{name}.{struct_.name} = {struct_.name}")
+
+        for type, variable in self.defaults.items():
+            body.append(f"{variable} = {type}()")
+
+        header = [
+            f"{variable} = struct.Struct({format!r})"
+            for format, variable in self.formats.items()
+        ]
+
+        return "\n".join([*header, "", "", *body, ""])
+
+    def _usages(self):
+        usages: typing.Dict[str, typing.List[int]] = {}
+
+        def visit(struct_: Struct, version: int):
+            versions = usages.setdefault(struct_.name, [])
+            if version in versions:
+                return
+
+            versions.append(version)
+            for field in struct_.fields:
+                if field.struct and version in field.versions:
+                    visit(self.message.structs[field.element_type], version)
+
+        for version in self.message.valid_versions:
+            visit(self.message.root, version)
+
+        return usages
+
+    def _class(self, struct_: Struct):
+        root = struct_ is self.message.root
+        base = ("(RequestBody)" if self.message.type == "request" else "(ResponseBody)") if root else ""
+        attributes = [field.attribute for field in struct_.fields]
+
+        lines = [
+            f"class {struct_.name}{base}:",
+            f"    __slots__ = ({''.join(f'{attribute!r}, ' for attribute in attributes)})",
+        ]
+
+        if root:
+            valid, flexible = self.message.valid_versions, self.message.flexible_versions
+            lines.extend([
+                "",
+                f"    API_KEY = {self.message.api_key}",
+                f"    VERSIONS = range({valid.lowest}, {valid.highest + 1})",
+                f"    FLEXIBLE_VERSIONS = range({flexible.lowest}, {flexible.highest + 1})",
+            ])
+
+        parameters = "".join(f", {field.attribute}={self._parameter_default(field)}" for field in struct_.fields)
+        lines.extend(["", f"    def __init__(self{parameters}):"])
+        for field in struct_.fields:
+            default = self._mutable_default(field)
+            if default is None:
+                lines.append(f"        self.{field.attribute} = {field.attribute}")
+            else:
+                lines.append(f"        self.{field.attribute} = {default} if {field.attribute} is {self._unset(field)} else {field.attribute}")
+
+        if not struct_.fields:
+            lines.append("        pass")
+
+        representation = ", ".join(f"{attribute}={{self.{attribute}!r}}" for attribute in attributes)
+        values = "".join(f"self.{attribute}, " for attribute in attributes)
+        lines.extend([
+            "",
+            "    def __repr__(self):",
+            f"        return f\"{struct_.name}({representation})\"",
+            "",
+            "    def __eq__(self, other):",
+            f"        return type(other) is type(self) and ({values}) == ({values.replace('self.', 'other.')})",
+        ])
+
+        if root:
+            lines.extend([
+                "",
+                "    @staticmethod",
+                "    def deserialize(reader, version):",
+                "        return _READERS[version](reader)",
+                "",
+                "    def serialize(self, writer, version):",
+                "        _WRITERS[version](self, writer)",
+            ])
+
+        lines.extend(["", ""])
+        return lines
+
+    def _reader(self, struct_: Struct, version: int):
+        flexible = version in self.message.flexible_versions
+
+        lines = [
+            f"def _read_{struct_.name}_v{version}(reader):",
+            f"    self = {struct_.name}.__new__({struct_.name})",
+        ]
+
+        fields = []
+        for field in struct_.fields:
+            if version not in field.versions or (flexible and field.tagged(version)):
+                lines.append(f"    self.{field.attribute} = {self._default(field)}")
+            else:
+                fields.append(field)
+
+        for run in _runs(fields):
+            if run[0].fixed:
+                targets = "".join(f"self.{field.attribute}, " for field in run)
+                lines.append(f"    {targets}= reader.read_struct({self._format(run)})")
+
+                for field in run:
+                    if field.type == "uuid":
+                        lines.append(f"    self.{field.attribute} = uuid.UUID(bytes=self.{field.attribute})")
+            else:
+                lines.extend(self._read_field(run[0], f"self.{run[0].attribute}", "reader", version, flexible, "    "))
+
+        if flexible:
+            tagged = [field for field in struct_.fields if version in field.versions and field.tagged(version)]
+
+            lines.extend([
+                "    for _ in range(reader.read_unsigned_varint()):",
+                "        tag = reader.read_unsigned_varint()" if tagged else "        reader.read_unsigned_varint()",
+                "        size = reader.read_unsigned_varint()",
+            ])
+
+            if tagged:
+                for index, field in enumerate(tagged):
+                    lines.extend([
+                        f"        {'if' if index == 0 else 'elif'} tag == {field.tag}:",
+                        "            tagged = buffer.ByteReader(reader.read_view(size))",
+                        *self._read_field(field, f"self.{field.attribute}", "tagged", version, flexible, "            "),
+                    ])
+
+                lines.extend([
+                    "        else:",
+                    "            reader.read_view(size)",
+                ])
+            else:
+                lines.append("        reader.read_view(size)")
+
+        lines.extend(["    return self", "", ""])
+        return lines
+
+    def _read_field(self, field: Field, target: str, reader: str, version: int, flexible: bool, indent: str):
+        element = field.element_type
+
+        if field.fixed:
+            lines = [f"{target}, = {reader}.read_struct({self._format([field])})"]
+            if field.type == "uuid":
+                lines.append(f"{target} = uuid.UUID(bytes={target})")
+
+        elif element in VARIABLE_TYPES and not field.array:
+            lines = [f"{target} = {reader}.{self._variable_reader(element, flexible)}()"]
+
+        elif not field.array:
+            call = f"_read_{element}_v{version}({reader})"
+
+            if version in field.nullable_versions:
+                lines = [f"{target} = None if {reader}.read_signed_char() < 0 else {call}"]
+            else:
+                lines = [f"{target} = {call}"]
+
+        else:
+            if element in FIXED_FORMATS:
+                items = f"list({reader}.read_struct(_array_struct({FIXED_FORMATS[element]!r}, count)))"
+                if element == "uuid":
+                    items = f"[uuid.UUID(bytes=item) for item in {reader}.read_struct(_array_struct('16s', count))]"
+            elif element in VARIABLE_TYPES:
+                items = f"[{reader}.{self._variable_reader(element, flexible)}() for _ in range(count)]"
+            else:
+                items = f"[_read_{element}_v{version}({reader}) for _ in range(count)]"
+
+            lines = [
+                f"count = {reader}.read_unsigned_varint() - 1" if flexible else f"count = {reader}.read_signed_int()",
+                f"{target} = None if count < 0 else {items}",
+            ]
+
+        return [indent + line for line in lines]
+
+    def _writer(self, struct_: Struct, version: int):
+        flexible = version in self.message.flexible_versions
+
+        lines = [f"def _write_{struct_.name}_v{version}(self, writer):"]
+
+        fields = [
+            field
+            for field in struct_.fields
+            if version in field.versions and not (flexible and field.tagged(version))
+        ]
+
+        for run in _runs(fields):
+            if run[0].fixed:
+                values = ", ".join(
+                    f"self.{field.attribute}.bytes" if field.type == "uuid" else f"self.{field.attribute}"
+                    for field in run
+                )
+                lines.append(f"    writer.write_struct({self._format(run)}, {values})")
+            else:
+                lines.extend(self._write_field(run[0], f"self.{run[0].attribute}", "writer", version, flexible, "    "))
+
+        if flexible:
+            tagged = [field for field in struct_.fields if version in field.versions and field.tagged(version)]
+
+            if tagged:
+                lines.append("    tagged_fields = 0")
+                for field in tagged:
+                    lines.extend([
+                        f"    if {self._present(field)}:",
+                        "        tagged_fields += 1",
+                    ])
+
+                lines.append("    writer.write_unsigned_varint(tagged_fields)")
+                for field in tagged:
+                    lines.extend([
+                        f"    if {self._present(field)}:",
+                        f"        writer.write_unsigned_varint({field.tag})",
+                        "        tagged = buffer.ByteWriter()",
+                        *self._write_field(field, f"self.{field.attribute}", "tagged", version, flexible, "        "),
+                        "        tagged = tagged.bytes",
+                        "        writer.write_unsigned_varint(len(tagged))",
+                        "        writer.write(tagged)",
+                    ])
+            else:
+                lines.append("    writer.write_unsigned_varint(0)")
+
+        if len(lines) == 1:
+            lines.append("    pass")
+
+        lines.extend(["", ""])
+        return lines
+
+    def _write_field(self, field: Field, value: str, writer: str, version: int, flexible: bool, indent: str):
+        element = field.element_type
+
+        if field.fixed:
+            argument = f"{value}.bytes" if field.type == "uuid" else value
+            lines = [f"{writer}.write_struct({self._format([field])}, {argument})"]
+
+        elif element in VARIABLE_TYPES and not field.array:
+            lines = [f"{writer}.{self._variable_writer(element, flexible)}({value})"]
+
+        elif not field.array:
+            call = f"_write_{element}_v{version}({value}, {writer})"
+
+            if version in field.nullable_versions:
+                lines = [
+                    f"if {value} is None:",
+                    f"    {writer}.write_byte(0xff)",
+                    "else:",
+                    f"    {writer}.write_byte(1)",
+                    f"    {call}",
+                ]
+            else:
+                lines = [call]
+
+        else:
+            lines = [
+                f"if {value} is None:",
+                f"    {writer}.write_unsigned_varint(0)" if flexible else f"    {writer}.write_signed_int(-1)",
+                "else:",
+                f"    {writer}.write_unsigned_varint(len({value}) + 1)" if flexible else f"    {writer}.write_signed_int(len({value}))",
+            ]
+
+            if element == "uuid":
+                lines.append(f"    {writer}.write_struct(_array_struct('16s', len({value})), *(item.bytes for item in {value}))")
+            elif element in FIXED_FORMATS:
+                lines.append(f"    {writer}.write_struct(_array_struct({FIXED_FORMATS[element]!r}, len({value})), *{value})")
+            elif element in VARIABLE_TYPES:
+                lines.extend([
+                    f"    for item in {value}:",
+                    f"        {writer}.{self._variable_writer(element, flexible)}(item)",
+                ])
+            else:
+                lines.extend([
+                    f"    for item in {value}:",
+                    f"        _write_{element}_v{version}(item, {writer})",
+                ])
+
+        return [indent + line for line in lines]
+
+    def _format(self, fields: typing.List[Field]):
+        format = "!" + "".join(FIXED_FORMATS[field.type] for field in fields)
+        return self.formats.setdefault(format, f"_STRUCT_{len(self.formats)}")
+
+    def _variable_reader(self, type: str, flexible: bool):
+        if type == "string":
+            return "read_compact_string" if flexible else "read_string"
+
+        if type == "bytes":
+            return "read_compact_bytes" if flexible else "read_bytes"
+
+        return "read_compact_records" if flexible else "read_bytes"
+
+    def _variable_writer(self, type: str, flexible: bool):
+        if type == "string":
+            return "write_compact_string" if flexible else "write_string"
+
+        if type == "bytes":
+            return "write_compact_bytes" if flexible else "write_bytes"
+
+        return "write_compact_records" if flexible else "write_records"
+
+    def _present(self, field: Field):
+        if field.array or field.struct:
+            if field.default == "null":
+                return f"self.{field.attribute} is not None"
+
+            if field.array:
+                return f"self.{field.attribute}"
+
+            return f"self.{field.attribute} != {self.defaults.setdefault(field.type, f'_DEFAULT_{field.type}')}"
+
+        if field.type == "bool":
+            return f"not self.{field.attribute}" if field.default == "true" else f"self.{field.attribute}"
+
+        return f"self.{field.attribute} != {self._default(field)}"
+
+    def _default(self, field: Field):
+        default = field.default
+
+        if field.array:
+            return "None" if default == "null" else "[]"
+
+        if field.struct:
+            return "None" if default == "null" else f"{field.type}()"
+
+        if default == "null":
+            return "None"
+
+        if field.type == "bool":
+            return repr(default == "true")
+
+        if field.type == "float64":
+            return repr(float(default or 0))
+
+        if field.type == "uuid":
+            return "ZERO_UUID"
+
+        if field.type == "string":
+            return repr(default or "")
+
+        if field.type == "bytes":
+            return "b''"
+
+        if field.type == "records":
+            return "None"
+
+        return repr(int(default or "0", 0))
+
+    def _parameter_default(self, field: Field):
+        if self._mutable_default(field) is not None:
+            return self._unset(field)
+
+        return self._default(field)
+
+    def _unset(self, field: Field):
+        if field.nullable_versions == NO_VERSIONS:
+            return "None"
+
+        return "MISSING"
+
+    def _mutable_default(self, field: Field):
+        default = self._default(field)
+
+        if (field.array or field.struct) and default != "None":
+            return default
+
+        return None
+
+
+def _runs(fields: typing.List[Field]):
+    runs: typing.List[typing.List[Field]] = []
+
+    for field in fields:
+        if field.fixed and runs and runs[-1][0].fixed:
+            runs[-1].append(field)
+        else:
+            runs.append([field])
+
+    return runs
@@ -2,10 +2,15 @@ import enum
 
 
 @enum.unique
-class ErrorCode(enum.Enum):
+class ErrorCode(enum.IntEnum):
 
     NONE = 0
     UNKNOWN_SERVER_ERROR = -1
+    OFFSET_OUT_OF_RANGE = 1
+    CORRUPT_MESSAGE = 2
     UNKNOWN_TOPIC = 3
     UNSUPPORTED_VERSION = 35
+    KAFKA_STORAGE_ERROR = 56
+    FETCH_SESSION_ID_NOT_FOUND = 70
+    INVALID_FETCH_SESSION_EPOCH = 71
     UNKNOWN_TOPIC_ID = 100
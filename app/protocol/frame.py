@@ -0,0 +1,133 @@
+import struct
+import threading
+import typing
+
+SIZE = struct.Struct("!i")
+
+DEFAULT_CAPACITY = 64 * 1024
+MAX_MESSAGE_SIZE = 100 * 1024 * 1024
+
+
+class BufferPool:
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, max_retained: int = 256):
+        self.capacity = capacity
+        self.max_retained = max_retained
+
+        self._buffers: typing.List[bytearray] = []
+        self._lock = threading.Lock()
+
+    def acquire(self, size: int = 0) -> bytearray:
+        if size <= self.capacity:
+            with self._lock:
+                if self._buffers:
+                    return self._buffers.pop()
+
+        return bytearray(max(size, self.capacity))
+
+    def release(self, data: bytearray):
+        if len(data) != self.capacity:
+            return
+
+        with self._lock:
+            if len(self._buffers) < self.max_retained:
+                self._buffers.append(data)
+
+
+POOL = BufferPool()
+
+
+class FrameBuffer:
+
+    # The transport receives straight into the view from `get_buffer` and
+    # reports the bytes with `buffer_updated`. The views returned by `pop`
+    # point into that buffer, they are only valid until the next call to
+    # `get_buffer` or `release`.
+
+    def __init__(self, pool: BufferPool = POOL):
+        self._pool = pool
+
+        self._data: typing.Optional[bytearray] = None
+        self._view: typing.Optional[memoryview] = None
+        self._start = 0
+        self._end = 0
+
+    @property
+    def empty(self):
+        return self._start == self._end
+
+    @property
+    def ready(self):
+        available = self._end - self._start
+        return available >= SIZE.size and self._missing() <= 0
+
+    def get_buffer(self, size_hint: int = 0) -> memoryview:
+        if self._data is None:
+            self._allocate(size_hint)
+        elif self._start == self._end:
+            self._start = self._end = 0
+
+        needed = max(size_hint, self._missing(), 1)
+        if len(self._data) - self._end < needed:
+            self._compact(needed)
+
+        return self._view[self._end:]
+
+    def buffer_updated(self, n: int):
+        self._end += n
+
+    def pop(self) -> typing.Optional[memoryview]:
+        available = self._end - self._start
+        if available < SIZE.size:
+            return None
+
+        message_size, = SIZE.unpack_from(self._data, self._start)
+        if message_size < 0 or message_size > MAX_MESSAGE_SIZE:
+            raise EOFError(f"invalid message size: {message_size}")
+
+        end = self._start + SIZE.size + message_size
+        if end > self._end:
+            return None
+
+        data = self._view[self._start + SIZE.size:end]
+        self._start = end
+
+        return data
+
+    def release(self):
+        if self._data is None or self._start != self._end:
+            return
+
+        self._view = None
+        self._pool.release(self._data)
+
+        self._data = None
+        self._start = self._end = 0
+
+    def _missing(self):
+        available = self._end - self._start
+        if available < SIZE.size:
+            return SIZE.size - available
+
+        message_size, = SIZE.unpack_from(self._data, self._start)
+        return SIZE.size + message_size - available
+
+    def _allocate(self, size: int):
+        self._data = self._pool.acquire(size)
+        self._view = memoryview(self._data)
+        self._start = self._end = 0
+
+    def _compact(self, needed: int):
+        available = self._end - self._start
+
+        if available + needed <= len(self._data):
+            self._view[:available] = self._view[self._start:self._end]
+        else:
+            data = bytearray(max(available + needed, 2 * len(self._data)))
+            data[:available] = self._view[self._start:self._end]
+
+            self._data = data
+            self._view = memoryview(data)
+
+        self._start = 0
+        self._end = available
@@ -1,4 +1,2 @@
-from .api_versions import *
 from .base import *
-from .describe import *
-from .fetch import *
+from .generated import *
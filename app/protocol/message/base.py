@@ -11,7 +11,7 @@ class RequestHeader:
 
 
 class RequestBody:
-    pass
+    __slots__ = ()
 
 
 class ResponseHeader:
@@ -21,6 +21,7 @@ class ResponseHeader:
 
 
 class ResponseBody:
+    __slots__ = ()
 
     def serialize(self, writer: buffer.ByteWriter):
         raise NotImplementedError()
@@ -36,10 +37,54 @@ class Request:
 class Response:
     header: RequestHeader
     body: ResponseBody
+    version: typing.Optional[int] = None
 
     def serialize(self, writer: buffer.ByteWriter):
         self.header.serialize(writer)
-        self.body.serialize(writer)
+
+        if self.version is None:
+            self.body.serialize(writer)
+        else:
+            self.body.serialize(writer, self.version)
+
+
+@dataclasses.dataclass
+class EncodedResponse:
+    correlation_id: int
+    data: bytes = dataclasses.field(repr=False)
+
+    @staticmethod
+    def of(response: Response):
+        writer = buffer.ByteWriter()
+        response.serialize(writer)
+
+        return EncodedResponse(
+            response.header.correlation_id,
+            writer.bytes[4:],
+        )
+
+
+@dataclasses.dataclass
+class RequestHeaderV1(RequestHeader):
+    request_api_key: int
+    request_api_version: int
+    correlation_id: int
+    client_id: typing.Optional[str]
+
+    @staticmethod
+    def deserialize(reader: buffer.ByteReader):
+        api_key = reader.read_signed_short()
+        api_version = reader.read_signed_short()
+
+        correlation_id = reader.read_signed_int()
+        client_id = reader.read_string()
+
+        return RequestHeaderV1(
+            api_key,
+            api_version,
+            correlation_id,
+            client_id,
+        )
 
 
 @dataclasses.dataclass
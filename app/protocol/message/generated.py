@@ -0,0 +1,19 @@
+from .. import codegen
+
+ApiVersionsRequest = codegen.build("ApiVersionsRequest", __name__)
+ApiVersionsResponse = codegen.build("ApiVersionsResponse", __name__)
+
+DescribeTopicPartitionsRequest = codegen.build("DescribeTopicPartitionsRequest", __name__)
+DescribeTopicPartitionsResponse = codegen.build("DescribeTopicPartitionsResponse", __name__)
+
+FetchRequest = codegen.build("FetchRequest", __name__)
+FetchResponse = codegen.build("FetchResponse", __name__)
+
+ListOffsetsRequest = codegen.build("ListOffsetsRequest", __name__)
+ListOffsetsResponse = codegen.build("ListOffsetsResponse", __name__)
+
+MetadataRequest = codegen.build("MetadataRequest", __name__)
+MetadataResponse = codegen.build("MetadataResponse", __name__)
+
+ProduceRequest = codegen.build("ProduceRequest", __name__)
+ProduceResponse = codegen.build("ProduceResponse", __name__)
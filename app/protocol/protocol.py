@@ -1,14 +1,22 @@
 
+import asyncio
+import collections
+import functools
+import itertools
+import os
 import socket
 import struct
 import typing
 
 from .. import buffer
 from .error import *
-from .message.api_versions import *
+from .frame import SIZE, FrameBuffer
 from .message.base import *
-from .message.describe import *
-from .message.fetch import *
+from .message.generated import *
+
+ENCODED_HEADER = struct.Struct("!ii")
+
+IOV_MAX = os.sysconf("SC_IOV_MAX") if hasattr(os, "sysconf") else 1024
 
 
 class ProtocolError(ValueError):
@@ -28,26 +36,66 @@ class ProtocolError(ValueError):
         super().__init__(*args)
 
 
+def _generated(message, lowest: int = 0):
+    return {
+        (message.API_KEY, version): functools.partial(message.deserialize, version=version)
+        for version in message.VERSIONS
+        if version >= lowest
+    }
+
+
 class MessageReader:
 
+    # Produce and Fetch start at the first versions carrying record batch v2,
+    # ListOffsets at the first one answering with a single offset.
     DESERIALIZERS = {
-        (1, 16): FetchRequestV16.deserialize,
-        (18, 4): ApiVersionsRequestV4.deserialize,
-        (18, 4): ApiVersionsRequestV4.deserialize,
-        (75, 0): DescribeTopicPartitionsRequestV0.deserialize,
+        **_generated(ProduceRequest, lowest=3),
+        **_generated(FetchRequest, lowest=4),
+        **_generated(ListOffsetsRequest, lowest=1),
+        **_generated(ApiVersionsRequest),
+        **_generated(DescribeTopicPartitionsRequest),
+        **_generated(MetadataRequest),
+    }
+
+    NON_FLEXIBLE_HEADERS = {
+        (message.API_KEY, version)
+        for message in (
+            ProduceRequest,
+            FetchRequest,
+            ListOffsetsRequest,
+            ApiVersionsRequest,
+            DescribeTopicPartitionsRequest,
+            MetadataRequest,
+        )
+        for version in message.VERSIONS
+        if version not in message.FLEXIBLE_VERSIONS
     }
 
     def __init__(self, socket: socket.socket):
         self._socket = socket
+        self._frames = FrameBuffer()
+
+    @property
+    def ready(self):
+        return self._frames.ready
 
     def next(self) -> Request:
-        data = self._next_message()
+        return self.decode(self._next_message())
+
+    @classmethod
+    def decode(cls, data: bytes) -> Request:
         reader = buffer.ByteReader(data)
 
-        header = RequestHeaderV2.deserialize(reader)
+        with reader.mark():
+            index = (reader.read_signed_short(), reader.read_signed_short())
+
+        if index in cls.NON_FLEXIBLE_HEADERS:
+            header = RequestHeaderV1.deserialize(reader)
+        else:
+            header = RequestHeaderV2.deserialize(reader)
 
         index = (header.request_api_key, header.request_api_version)
-        deserializer = self.DESERIALIZERS.get(index)
+        deserializer = cls.DESERIALIZERS.get(index)
         if deserializer is None:
             raise ProtocolError(
                 ErrorCode.UNSUPPORTED_VERSION,
@@ -59,54 +107,322 @@ class MessageReader:
         return Request(header, body)
 
     def _next_message(self):
-        data = self._socket.recv(4)
-        if not len(data):
-            raise EOFError("could not read message size")
+        while True:
+            data = self._frames.pop()
+            if data is not None:
+                return data
+
+            read = self._socket.recv_into(self._frames.get_buffer())
+            if not read:
+                if self._frames.empty:
+                    raise EOFError("could not read message size")
+
+                raise EOFError("message size does not match")
+
+            self._frames.buffer_updated(read)
+
+
+class MessageProtocol(asyncio.BufferedProtocol):
+
+    # The event loop receives straight into the pooled FrameBuffer. Reading is
+    # paused while a complete frame waits to be consumed, so pipelined
+    # requests stay in the socket buffer instead of growing ours.
+
+    def __init__(
+        self,
+        on_connection: typing.Callable[["AsyncMessageReader", "AsyncMessageWriter"], typing.Awaitable[None]],
+    ):
+        self.transport: typing.Optional[asyncio.Transport] = None
+        self.frames = FrameBuffer()
+
+        self._on_connection = on_connection
+        self._task: typing.Optional[asyncio.Task] = None
+
+        self._eof = False
+        self._error: typing.Optional[Exception] = None
+        self._waiter: typing.Optional[asyncio.Future] = None
+
+        self._paused = False
+        self._drain_waiters: typing.Deque[asyncio.Future] = collections.deque()
+
+    def connection_made(self, transport: asyncio.Transport):
+        self.transport = transport
+        self._task = asyncio.ensure_future(self._on_connection(
+            AsyncMessageReader(self),
+            AsyncMessageWriter(self),
+        ))
+
+    def connection_lost(self, error: typing.Optional[Exception]):
+        self._eof = True
+        self._error = error
 
-        message_size, = struct.unpack("!i", data)
-        data = self._socket.recv(message_size)
+        self._wake()
+
+        while self._drain_waiters:
+            waiter = self._drain_waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(error or ConnectionResetError("connection lost"))
+
+        self.frames.release()
+
+    def get_buffer(self, size_hint: int) -> memoryview:
+        return self.frames.get_buffer(max(size_hint, 0))
+
+    def buffer_updated(self, size: int):
+        self.frames.buffer_updated(size)
+
+        if self.frames.ready:
+            self.transport.pause_reading()
+            self._wake()
+
+    def eof_received(self):
+        self._eof = True
+        self._wake()
+
+        return True
+
+    def pause_writing(self):
+        self._paused = True
+
+    def resume_writing(self):
+        self._paused = False
+
+        while self._drain_waiters:
+            waiter = self._drain_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def wait_for_data(self):
+        if self._error is not None:
+            raise self._error
+
+        if self._eof:
+            if self.frames.empty:
+                raise EOFError("could not read message size")
 
-        if len(data) != message_size:
             raise EOFError("message size does not match")
 
-        print("read", data.hex())
-        return data
+        if self.frames.empty:
+            self.frames.release()
+
+        self._waiter = asyncio.get_running_loop().create_future()
+        self.transport.resume_reading()
+
+        try:
+            await self._waiter
+        finally:
+            self._waiter = None
+
+    async def drain(self):
+        if self.transport.is_closing():
+            await asyncio.sleep(0)
+
+            if self._eof:
+                raise self._error or ConnectionResetError("connection lost")
+
+        if not self._paused:
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._drain_waiters.append(waiter)
+
+        await waiter
+
+    def _wake(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+
+async def start_server(
+    on_connection: typing.Callable[["AsyncMessageReader", "AsyncMessageWriter"], typing.Awaitable[None]],
+    host: str,
+    port: int,
+    **kwargs,
+) -> asyncio.AbstractServer:
+    return await asyncio.get_running_loop().create_server(
+        lambda: MessageProtocol(on_connection),
+        host,
+        port,
+        **kwargs,
+    )
+
+
+class AsyncMessageReader:
+
+    def __init__(self, protocol: MessageProtocol):
+        self._protocol = protocol
+
+    async def next(self) -> Request:
+        return MessageReader.decode(await self._next_message())
+
+    async def _next_message(self):
+        while True:
+            data = self._protocol.frames.pop()
+            if data is not None:
+                return data
+
+            await self._protocol.wait_for_data()
 
 
 class MessageWriter:
 
-    SERIALIZERS = {
-        (ApiVersionsResponseV4): ApiVersionsResponseV4.serialize,
-        (FetchResponseV16): FetchResponseV16.serialize,
-    }
+    CAPACITY_HINTS: typing.Dict[type, int] = {}
+    MAX_CAPACITY_HINT = 64 * 1024
 
     def __init__(self, socket: socket.socket):
         self._socket = socket
+        self._pending: typing.List[typing.Union[memoryview, bytes, buffer.FileRegion]] = []
 
-    def send(
+    def queue(
         self,
-        response: Response
+        response: typing.Union[Response, EncodedResponse]
     ):
-        writer = buffer.ByteWriter()
+        self._pending.extend(self.encode(response))
+
+    def queue_error(
+        self,
+        correlation_id: int,
+        error_code: ErrorCode
+    ):
+        self._pending.append(self.encode_error(correlation_id, error_code))
+
+    def flush(self):
+        buffers, self._pending = self._pending, []
+        send_buffers(self._socket, buffers)
+
+    @staticmethod
+    def encode(response: typing.Union[Response, EncodedResponse]) -> typing.List[typing.Union[memoryview, bytes, buffer.FileRegion]]:
+        if isinstance(response, EncodedResponse):
+            return [ENCODED_HEADER.pack(4 + len(response.data), response.correlation_id), response.data]
+
+        kind = type(response.body)
+
+        writer = buffer.ByteWriter(MessageWriter.CAPACITY_HINTS.get(kind, buffer.ByteWriter.DEFAULT_CAPACITY))
+        writer.write_signed_int(0)
         response.serialize(writer)
 
-        bytes = writer.bytes
+        buffers = writer.buffers
+        SIZE.pack_into(buffers[0], 0, len(writer) - SIZE.size)
 
-        self._socket.send(struct.pack(
-            "!i",
-            len(bytes),
-        ))
+        used = min(len(writer), MessageWriter.MAX_CAPACITY_HINT)
+        hint = MessageWriter.CAPACITY_HINTS.get(kind, used)
+        MessageWriter.CAPACITY_HINTS[kind] = max(used, (hint + used) // 2)
 
-        self._socket.send(bytes)
+        return buffers
 
-    def send_error(
-        self,
+    @staticmethod
+    def encode_error(
         correlation_id: int,
         error_code: ErrorCode
-    ):
-        self._socket.send(struct.pack(
+    ) -> bytes:
+        return struct.pack(
             "!iih",
             4 + 2,
             correlation_id,
             error_code.value,
-        ))
+        )
+
+
+class AsyncMessageWriter:
+
+    def __init__(self, protocol: MessageProtocol):
+        self._protocol = protocol
+        self._transport = protocol.transport
+        self._pending: typing.List[typing.Union[memoryview, bytes, buffer.FileRegion]] = []
+
+    def get_extra_info(self, name: str, default=None):
+        return self._transport.get_extra_info(name, default)
+
+    def close(self):
+        self._transport.close()
+
+    def queue(
+        self,
+        response: typing.Union[Response, EncodedResponse]
+    ):
+        self._pending.extend(MessageWriter.encode(response))
+
+    def queue_error(
+        self,
+        correlation_id: int,
+        error_code: ErrorCode
+    ):
+        self._pending.append(MessageWriter.encode_error(correlation_id, error_code))
+
+    async def flush(self):
+        buffers, self._pending = self._pending, []
+        views = []
+
+        for item in buffers:
+            if not isinstance(item, buffer.FileRegion):
+                views.append(item)
+                continue
+
+            if views:
+                self._transport.writelines(views)
+                views = []
+
+            sent = await asyncio.get_running_loop().sendfile(
+                self._transport,
+                item.file,
+                item.offset,
+                item.length,
+            )
+
+            if sent != item.length:
+                raise EOFError("file region is shorter than expected")
+
+        if views:
+            self._transport.writelines(views)
+
+        await self._protocol.drain()
+
+
+def send_buffers(
+    socket: socket.socket,
+    buffers: typing.List[typing.Union[memoryview, bytes, buffer.FileRegion]],
+):
+    views = collections.deque()
+
+    for item in buffers:
+        if isinstance(item, buffer.FileRegion):
+            _send_views(socket, views)
+            _send_file_region(socket, item)
+        elif len(item):
+            views.append(memoryview(item).cast("B"))
+
+    _send_views(socket, views)
+
+
+def _send_views(
+    socket: socket.socket,
+    views: typing.Deque[memoryview],
+):
+    while views:
+        sent = socket.sendmsg(itertools.islice(views, IOV_MAX))
+
+        while sent:
+            view = views[0]
+
+            if sent < len(view):
+                views[0] = view[sent:]
+                break
+
+            sent -= len(view)
+            views.popleft()
+
+
+def _send_file_region(
+    socket: socket.socket,
+    region: buffer.FileRegion,
+):
+    offset = region.offset
+    remaining = region.length
+
+    while remaining:
+        sent = os.sendfile(socket.fileno(), region.file.fileno(), offset, remaining)
+        if not sent:
+            raise EOFError("file region is shorter than expected")
+
+        offset += sent
+        remaining -= sent
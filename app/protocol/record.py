@@ -1,56 +1,74 @@
 import dataclasses
+import struct
 import typing
 import uuid
 
 from .. import buffer
 
+BATCH_HEADER = struct.Struct("!qiibIhiqqqhii")
+LOG_OVERHEAD = 12
+COMPRESSION_CODEC_MASK = 0x07
 
+
+class MetadataRecord:
+
+    @staticmethod
+    def decode(value: memoryview) -> typing.Optional["MetadataRecord"]:
+        reader = buffer.ByteReader(value)
+        frame_version = reader.read_signed_char()
+        record_type = reader.read_signed_char()
+        record_version = reader.read_signed_char()
+
+        deserializer = METADATA_RECORDS.get(record_type)
+        if deserializer is None:
+            return None
+
+        return deserializer(reader)
+
+
+@dataclasses.dataclass
 class Record:
+    attributes: int
+    timestamp_delta: int
+    offset_delta: int
+    key: typing.Optional[memoryview]
+    value: typing.Optional[memoryview]
+    headers: typing.List[typing.Tuple[str, typing.Optional[memoryview]]]
 
     @staticmethod
     def deserialize(reader: buffer.ByteReader):
-        length = reader.read_signed_varint()
+        reader = buffer.ByteReader(reader.read_view(reader.read_signed_varint()))
         attributes = reader.read_signed_char()
         timestamp_delta = reader.read_signed_varlong()
         offset_delta = reader.read_signed_varint()
 
-        key_length = reader.read_unsigned_varint()
-        key = reader.read(key_length - 1) if key_length else None
-        # key = reader.read_compact_bytes()
+        key_length = reader.read_signed_varint()
+        key = reader.read_view(key_length) if key_length >= 0 else None
 
         value_length = reader.read_signed_varint()
-        value = reader.read(value_length)
-
-        record_reader = buffer.ByteReader(value)
-        record_frame_version = record_reader.read_signed_char()
-        record_type = record_reader.read_signed_char()
-        record_version = record_reader.read_signed_char()
-
-        match record_type:
-            case 2:
-                record = TopicRecord.deserialize(record_reader)
-
-            case 3:
-                record = PartitionRecord.deserialize(record_reader)
+        value = reader.read_view(value_length) if value_length >= 0 else None
 
-            case 12:
-                record = FeatureLevelRecord.deserialize(record_reader)
+        headers = []
+        for _ in range(reader.read_signed_varint()):
+            header_key = str(reader.read_view(reader.read_signed_varint()), "utf-8")
 
-            case _:
-                raise ValueError(f"unknown record type: {record_type}")
+            header_value_length = reader.read_signed_varint()
+            header_value = reader.read_view(header_value_length) if header_value_length >= 0 else None
 
-        assert record_reader.eof
+            headers.append((header_key, header_value))
 
-        headers = reader.read_compact_dict(
-            buffer.ByteReader.read_compact_string,
-            buffer.ByteReader.read_compact_bytes,
+        return Record(
+            attributes,
+            timestamp_delta,
+            offset_delta,
+            key,
+            value,
+            headers,
         )
 
-        return record
-
 
 @dataclasses.dataclass
-class TopicRecord(Record):
+class TopicRecord(MetadataRecord):
     name: str
     id: uuid.UUID
 
@@ -68,7 +86,7 @@ class TopicRecord(Record):
 
 
 @dataclasses.dataclass
-class PartitionRecord(Record):
+class PartitionRecord(MetadataRecord):
     id: int
     topic_id: uuid.UUID
     replicas: typing.List[int]
@@ -110,7 +128,7 @@ class PartitionRecord(Record):
 
 
 @dataclasses.dataclass
-class FeatureLevelRecord(Record):
+class FeatureLevelRecord(MetadataRecord):
     name: str
     feature_level: int
 
@@ -127,9 +145,33 @@ class FeatureLevelRecord(Record):
         )
 
 
+METADATA_RECORDS: typing.Dict[int, typing.Callable[[buffer.ByteReader], MetadataRecord]] = {
+    2: TopicRecord.deserialize,
+    3: PartitionRecord.deserialize,
+    12: FeatureLevelRecord.deserialize,
+}
+
+
+class Records:
+
+    def __init__(self, data: memoryview, count: int):
+        self.data = data
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self) -> typing.Iterator[Record]:
+        reader = buffer.ByteReader(self.data)
+
+        for _ in range(self.count):
+            yield Record.deserialize(reader)
+
+
 @dataclasses.dataclass
 class Batch:
     base_offset: int
+    batch_length: int
     partition_leader_epoch: int
     magic: int
     crc: int
@@ -140,36 +182,31 @@ class Batch:
     producer_id: int
     producer_epoch: int
     base_sequence: int
-    records: typing.List[Record]
+    records_count: int
+    data: memoryview = dataclasses.field(repr=False)
+
+    @property
+    def last_offset(self):
+        return self.base_offset + self.last_offset_delta
+
+    @property
+    def size(self):
+        return LOG_OVERHEAD + self.batch_length
+
+    @property
+    def compressed(self):
+        return bool(self.attributes & COMPRESSION_CODEC_MASK)
+
+    @property
+    def records(self) -> Records:
+        if self.compressed:
+            raise ValueError(f"compressed batch: {self.attributes & COMPRESSION_CODEC_MASK}")
+
+        return Records(self.data, self.records_count)
 
     @staticmethod
     def deserialize(reader: buffer.ByteReader):
-        base_offset = reader.read_signed_long()
-        reader = buffer.ByteReader(reader.read_bytes())
-        partition_leader_epoch = reader.read_signed_int()
-        magic = reader.read_signed_char()
-        crc = reader.read_unsigned_int()
-        attributes = reader.read_signed_short()
-        last_offset_delta = reader.read_signed_int()
-        base_timestamp = reader.read_signed_long()
-        max_timestamp = reader.read_signed_long()
-        producer_id = reader.read_signed_long()
-        producer_epoch = reader.read_signed_short()
-        base_sequence = reader.read_signed_int()
-
-        records = reader.read_array(Record.deserialize)
-
-        return Batch(
-            base_offset,
-            partition_leader_epoch,
-            magic,
-            crc,
-            attributes,
-            last_offset_delta,
-            base_timestamp,
-            max_timestamp,
-            producer_id,
-            producer_epoch,
-            base_sequence,
-            records,
-        )
+        header = BATCH_HEADER.unpack_from(reader.read_view(BATCH_HEADER.size))
+        data = reader.read_view(LOG_OVERHEAD + header[1] - BATCH_HEADER.size)
+
+        return Batch(*header, data)
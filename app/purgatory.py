@@ -0,0 +1,112 @@
+import asyncio
+import socket
+import typing
+
+Key = typing.Tuple[str, int]
+
+
+class Purgatory:
+
+    def __init__(self):
+        self._loop: typing.Optional[asyncio.AbstractEventLoop] = None
+        self._watchers: typing.Dict[Key, typing.Set[asyncio.Future]] = {}
+
+        self._socket: typing.Optional[socket.socket] = None
+        self._peers: typing.List[str] = []
+
+    def attach(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        address: typing.Optional[str] = None,
+        peers: typing.Iterable[str] = (),
+    ):
+        self._loop = loop
+
+        if address is None:
+            return
+
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+        self._socket.bind(address)
+
+        self._peers = list(peers)
+
+        loop.add_reader(self._socket.fileno(), self._receive)
+
+    def watch(self, keys: typing.Iterable[Key]) -> asyncio.Future:
+        keys = list(keys)
+        future = self._loop.create_future()
+
+        for key in keys:
+            self._watchers.setdefault(key, set()).add(future)
+
+        future.add_done_callback(lambda _: self._unwatch(keys, future))
+        return future
+
+    async def wait(
+        self,
+        watcher: asyncio.Future,
+        timeout: float,
+    ) -> bool:
+        try:
+            await asyncio.wait_for(watcher, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def notify(self, key: Key):
+        if self._loop is None:
+            return
+
+        try:
+            self._loop.call_soon_threadsafe(self._wake, key)
+        except RuntimeError:
+            return
+
+        if self._socket is None:
+            return
+
+        message = _encode(key)
+        for peer in self._peers:
+            try:
+                self._socket.sendto(message, peer)
+            except OSError:
+                pass
+
+    def _wake(self, key: Key):
+        for future in self._watchers.pop(key, ()):
+            if not future.done():
+                future.set_result(key)
+
+    def _unwatch(self, keys: typing.Iterable[Key], future: asyncio.Future):
+        for key in keys:
+            watchers = self._watchers.get(key)
+            if watchers is None:
+                continue
+
+            watchers.discard(future)
+            if not watchers:
+                del self._watchers[key]
+
+    def _receive(self):
+        while True:
+            try:
+                message = self._socket.recv(1024)
+            except (BlockingIOError, InterruptedError):
+                return
+
+            self._wake(_decode(message))
+
+
+def address(group: int, index: int):
+    return f"\0kafka-purgatory-{group}-{index}"
+
+
+def _encode(key: Key):
+    topic_name, partition_index = key
+    return f"{topic_name}\0{partition_index}".encode("utf-8")
+
+
+def _decode(message: bytes) -> Key:
+    topic_name, partition_index = message.decode("utf-8").split("\0")
+    return topic_name, int(partition_index)
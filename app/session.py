@@ -0,0 +1,178 @@
+import collections
+import dataclasses
+import random
+import threading
+import typing
+import uuid
+
+from . import protocol
+
+INITIAL_EPOCH = 0
+FINAL_EPOCH = -1
+MAX_SESSION_ID = 2 ** 31 - 1
+
+# Fetch names topics up to v12 and uses topic ids from v13, whichever field a
+# version lacks keeps its default.
+PartitionKey = typing.Tuple[uuid.UUID, str, int]
+
+
+@dataclasses.dataclass
+class SessionPartition:
+
+    topic_id: uuid.UUID
+    topic_name: str
+    request: protocol.message.FetchRequest.FetchPartition
+    high_watermark: int = -1
+    log_start_offset: int = -1
+
+    def changed(self, response: protocol.message.FetchResponse.PartitionData):
+        if response.error_code != protocol.ErrorCode.NONE:
+            return True
+
+        if response.records is not None and len(response.records):
+            return True
+
+        return (
+            response.high_watermark != self.high_watermark
+            or response.log_start_offset != self.log_start_offset
+        )
+
+
+@dataclasses.dataclass
+class Session:
+
+    id: int
+    epoch: int
+    partitions: typing.Dict[PartitionKey, SessionPartition]
+
+
+@dataclasses.dataclass
+class FetchContext:
+
+    error_code: protocol.ErrorCode
+    session: typing.Optional[Session]
+    partitions: typing.List[SessionPartition]
+    incremental: bool
+
+    @property
+    def session_id(self):
+        if self.session is None:
+            return 0
+
+        return self.session.id
+
+
+class SessionCache:
+
+    def __init__(self, max_sessions: int):
+        self.max_sessions = max_sessions
+
+        self._sessions: "collections.OrderedDict[int, Session]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def open(self, request: protocol.message.FetchRequest) -> FetchContext:
+        with self._lock:
+            return self._open(request)
+
+    def complete(
+        self,
+        context: FetchContext,
+        response: protocol.message.FetchResponse,
+    ):
+        if context.session is None:
+            return
+
+        with self._lock:
+            for topic_response in response.responses:
+                for partition_response in topic_response.partitions:
+                    key = (topic_response.topic_id, topic_response.topic, partition_response.partition_index)
+
+                    partition = context.session.partitions.get(key)
+                    if partition is None:
+                        continue
+
+                    partition.high_watermark = partition_response.high_watermark
+                    partition.log_start_offset = partition_response.log_start_offset
+
+    def _open(self, request: protocol.message.FetchRequest):
+        if request.session_epoch == FINAL_EPOCH:
+            self._sessions.pop(request.session_id, None)
+            return FetchContext(protocol.ErrorCode.NONE, None, _full_partitions(request), False)
+
+        if request.session_epoch == INITIAL_EPOCH:
+            self._sessions.pop(request.session_id, None)
+
+            partitions = _full_partitions(request)
+            session = self._create(partitions)
+
+            return FetchContext(protocol.ErrorCode.NONE, session, partitions, False)
+
+        if request.session_id == 0:
+            return FetchContext(protocol.ErrorCode.INVALID_FETCH_SESSION_EPOCH, None, [], False)
+
+        session = self._sessions.get(request.session_id)
+        if session is None:
+            return FetchContext(protocol.ErrorCode.FETCH_SESSION_ID_NOT_FOUND, None, [], False)
+
+        if session.epoch != request.session_epoch:
+            return FetchContext(protocol.ErrorCode.INVALID_FETCH_SESSION_EPOCH, None, [], False)
+
+        self._sessions.move_to_end(session.id)
+        session.epoch = _next_epoch(session.epoch)
+
+        for topic_request in request.topics:
+            for partition_request in topic_request.partitions:
+                key = (topic_request.topic_id, topic_request.topic, partition_request.partition)
+
+                partition = session.partitions.get(key)
+                if partition is None:
+                    session.partitions[key] = SessionPartition(topic_request.topic_id, topic_request.topic, partition_request)
+                else:
+                    partition.request = partition_request
+
+        for forgotten_topic in request.forgotten_topics_data:
+            for partition_index in forgotten_topic.partitions:
+                session.partitions.pop((forgotten_topic.topic_id, forgotten_topic.topic, partition_index), None)
+
+        return FetchContext(protocol.ErrorCode.NONE, session, list(session.partitions.values()), True)
+
+    def _create(self, partitions: typing.List[SessionPartition]):
+        if self.max_sessions <= 0 or not partitions:
+            return None
+
+        while len(self._sessions) >= self.max_sessions:
+            self._sessions.popitem(last=False)
+
+        session_id = random.randint(1, MAX_SESSION_ID)
+        while session_id in self._sessions:
+            session_id = random.randint(1, MAX_SESSION_ID)
+
+        session = Session(
+            id=session_id,
+            epoch=_next_epoch(INITIAL_EPOCH),
+            partitions={
+                (partition.topic_id, partition.topic_name, partition.request.partition): partition
+                for partition in partitions
+            },
+        )
+
+        self._sessions[session_id] = session
+        return session
+
+
+def _full_partitions(request: protocol.message.FetchRequest):
+    return [
+        SessionPartition(topic_request.topic_id, topic_request.topic, partition_request)
+        for topic_request in request.topics
+        for partition_request in topic_request.partitions
+    ]
+
+
+def _next_epoch(epoch: int):
+    if epoch == MAX_SESSION_ID:
+        return 1
+
+    return epoch + 1
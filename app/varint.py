@@ -1,5 +1,14 @@
 import typing
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+BULK_THRESHOLD = 64
+
+_SINGLE_BYTES = [bytes([value]) for value in range(0x80)]
+
 
 def zigzag_encode(value):
     if value >= 0:
@@ -47,6 +56,117 @@ def write_unsigned_long(stream: typing.BinaryIO, value: int):
     _write(stream, value)
 
 
+def decode_unsigned(
+    data: typing.Union[bytes, bytearray, memoryview],
+    offset: int,
+    bits: int = 64,
+) -> typing.Tuple[int, int]:
+    result = 0
+    shift = 0
+
+    try:
+        while True:
+            byte_value = data[offset]
+            offset += 1
+
+            if byte_value < 0x80:
+                return result | (byte_value << shift), offset
+
+            result |= (byte_value & 0x7F) << shift
+
+            shift += 7
+            if shift >= bits:
+                raise ValueError("varint is too long")
+    except IndexError:
+        raise EOFError("unexpected while reading varint") from None
+
+
+def decode_signed(
+    data: typing.Union[bytes, bytearray, memoryview],
+    offset: int,
+    bits: int = 64,
+) -> typing.Tuple[int, int]:
+    value, offset = decode_unsigned(data, offset, bits)
+    return zigzag_decode(value), offset
+
+
+def decode_unsigned_many(
+    data: typing.Union[bytes, bytearray, memoryview],
+    offset: int,
+    count: int,
+    bits: int = 64,
+) -> typing.Tuple[typing.List[int], int]:
+    if numpy is not None and count >= BULK_THRESHOLD:
+        values, offset = _decode_unsigned_many_numpy(data, offset, count, bits)
+        return values.tolist(), offset
+
+    values = []
+    length = len(data)
+
+    for _ in range(count):
+        if offset < length and data[offset] < 0x80:
+            values.append(data[offset])
+            offset += 1
+        else:
+            value, offset = decode_unsigned(data, offset, bits)
+            values.append(value)
+
+    return values, offset
+
+
+def decode_signed_many(
+    data: typing.Union[bytes, bytearray, memoryview],
+    offset: int,
+    count: int,
+    bits: int = 64,
+) -> typing.Tuple[typing.List[int], int]:
+    if numpy is not None and count >= BULK_THRESHOLD:
+        values, offset = _decode_unsigned_many_numpy(data, offset, count, bits)
+        values = (values >> numpy.uint64(1)) ^ (numpy.uint64(0) - (values & numpy.uint64(1)))
+        return values.view(numpy.int64).tolist(), offset
+
+    values, offset = decode_unsigned_many(data, offset, count, bits)
+    return [zigzag_decode(value) for value in values], offset
+
+
+def encode_unsigned(value: int) -> bytes:
+    if value < 0x80:
+        return _SINGLE_BYTES[value]
+
+    data = bytearray(unsigned_size(value))
+    encode_unsigned_into(data, 0, value)
+
+    return bytes(data)
+
+
+def encode_signed(value: int) -> bytes:
+    return encode_unsigned(zigzag_encode(value))
+
+
+def unsigned_size(value: int) -> int:
+    if value < 0x80:
+        return 1
+
+    return (value.bit_length() + 6) // 7
+
+
+def encode_unsigned_into(
+    data: bytearray,
+    offset: int,
+    value: int,
+) -> int:
+    while True:
+        to_write = value & 0x7F
+        value >>= 7
+
+        if value:
+            data[offset] = to_write | 0x80
+            offset += 1
+        else:
+            data[offset] = to_write
+            return offset + 1
+
+
 def _read(stream: typing.BinaryIO, bits: int):
     result = 0
     shift = 0
@@ -56,7 +176,7 @@ def _read(stream: typing.BinaryIO, bits: int):
         if not byte:
             raise EOFError("unexpected while reading varint")
 
-        byte_value = ord(byte)
+        byte_value = byte[0]
 
         result |= (byte_value & 0x7F) << shift
 
@@ -71,12 +191,38 @@ def _read(stream: typing.BinaryIO, bits: int):
 
 
 def _write(stream: typing.BinaryIO, value: int):
-    while True:
-        to_write = value & 0x7F
-        value >>= 7
+    stream.write(encode_unsigned(value))
 
-        if value:
-            stream.write(bytes([to_write | 0x80]))
-        else:
-            stream.write(bytes([to_write]))
-            break
+
+def _decode_unsigned_many_numpy(
+    data: typing.Union[bytes, bytearray, memoryview],
+    offset: int,
+    count: int,
+    bits: int,
+):
+    max_size = (bits + 6) // 7
+
+    window = numpy.frombuffer(
+        data,
+        dtype=numpy.uint8,
+        count=min(len(data) - offset, count * max_size),
+        offset=offset,
+    )
+
+    ends = numpy.flatnonzero(window < 0x80)[:count]
+    if len(ends) < count:
+        raise EOFError("unexpected while reading varint")
+
+    starts = numpy.empty(count, dtype=numpy.intp)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+
+    sizes = ends - starts + 1
+    if sizes.max() > max_size:
+        raise ValueError("varint is too long")
+
+    end = int(ends[-1]) + 1
+    shifts = (numpy.arange(end) - numpy.repeat(starts, sizes)) * 7
+
+    payload = (window[:end] & 0x7F).astype(numpy.uint64) << shifts.astype(numpy.uint64)
+    return numpy.bitwise_or.reduceat(payload, starts), offset + end
@@ -0,0 +1,370 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import timeit
+import tracemalloc
+import typing
+import uuid
+
+from app import buffer, varint
+from app.protocol import record
+from app.protocol.error import ErrorCode
+from app.protocol.message.generated import (
+    ApiVersionsResponse,
+    DescribeTopicPartitionsResponse,
+    FetchResponse,
+    ListOffsetsResponse,
+    MetadataResponse,
+    ProduceResponse,
+)
+
+from . import fixtures
+
+COUNT = 10_000
+REPEAT = 5
+
+METADATA_TOPICS = 100
+METADATA_PARTITIONS = 10
+DESCRIBE_PARTITIONS = 2000
+FETCH_PARTITIONS = 64
+FETCH_RECORDS = 64
+FETCH_RECORD_SIZE = 1024
+
+THRESHOLD = 0.25
+ALLOCATION_SLACK = 16
+
+
+class Case(typing.NamedTuple):
+    function: typing.Callable[[], typing.Any]
+    operations: int
+
+
+def _strings() -> typing.List[str]:
+    generator = random.Random(1)
+
+    return [
+        "".join(generator.choices("abcdefghijklmnopqrstuvwxyz-", k=generator.randrange(1, 48)))
+        for _ in range(COUNT)
+    ]
+
+
+def _encode(serializer: typing.Callable[[buffer.ByteWriter], None]) -> bytes:
+    writer = buffer.ByteWriter()
+    serializer(writer)
+
+    return writer.bytes
+
+
+def _buffer_cases() -> typing.Dict[str, Case]:
+    values = [value & 0x7fffffff for value in fixtures.varint_values(COUNT)]
+    strings = _strings()
+
+    ints = _encode(lambda writer: [writer.write_signed_int(value) for value in values])
+    varints = _encode(lambda writer: [writer.write_unsigned_varint(value) for value in values])
+    compact_strings = _encode(lambda writer: [writer.write_compact_string(value) for value in strings])
+    uuids = bytes(16 * COUNT)
+
+    def read(data: bytes, method: typing.Callable[[buffer.ByteReader], typing.Any]):
+        reader = buffer.ByteReader(data)
+        return [method(reader) for _ in range(COUNT)]
+
+    def write(method: typing.Callable[[buffer.ByteWriter, typing.Any], None], items: typing.List[typing.Any]):
+        writer = buffer.ByteWriter()
+        for item in items:
+            method(writer, item)
+
+        return writer.buffers
+
+    return {
+        "ByteReader.read_signed_int": Case(lambda: read(ints, buffer.ByteReader.read_signed_int), COUNT),
+        "ByteReader.read_unsigned_varint": Case(lambda: read(varints, buffer.ByteReader.read_unsigned_varint), COUNT),
+        "ByteReader.read_compact_string": Case(lambda: read(compact_strings, buffer.ByteReader.read_compact_string), COUNT),
+        "ByteReader.read_uuid": Case(lambda: read(uuids, buffer.ByteReader.read_uuid), COUNT),
+        "ByteWriter.write_signed_int": Case(lambda: write(buffer.ByteWriter.write_signed_int, values), COUNT),
+        "ByteWriter.write_unsigned_varint": Case(lambda: write(buffer.ByteWriter.write_unsigned_varint, values), COUNT),
+        "ByteWriter.write_compact_string": Case(lambda: write(buffer.ByteWriter.write_compact_string, strings), COUNT),
+    }
+
+
+def _varint_cases() -> typing.Dict[str, Case]:
+    values = fixtures.varint_values(COUNT)
+    data = b"".join(map(varint.encode_unsigned, values))
+
+    def decode():
+        view = memoryview(data)
+        decoded = []
+
+        offset = 0
+        for _ in range(COUNT):
+            value, offset = varint.decode_unsigned(view, offset)
+            decoded.append(value)
+
+        return decoded
+
+    return {
+        "varint.decode_unsigned": Case(decode, COUNT),
+        "varint.decode_unsigned_many": Case(lambda: varint.decode_unsigned_many(memoryview(data), 0, COUNT), COUNT),
+        "varint.encode_unsigned": Case(lambda: [varint.encode_unsigned(value) for value in values], COUNT),
+    }
+
+
+def _record_cases() -> typing.Dict[str, Case]:
+    data = fixtures.metadata_log(METADATA_TOPICS, METADATA_PARTITIONS)
+    batches = METADATA_TOPICS
+    records = METADATA_TOPICS * (METADATA_PARTITIONS + 1)
+
+    def deserialize():
+        reader = buffer.ByteReader(data)
+        return [record.Batch.deserialize(reader) for _ in range(batches)]
+
+    parsed = deserialize()
+
+    return {
+        "Batch.deserialize": Case(deserialize, batches),
+        "Record.deserialize": Case(lambda: [item for batch in parsed for item in batch.records], records),
+        "MetadataRecord.decode": Case(
+            lambda: [record.MetadataRecord.decode(item.value) for batch in parsed for item in batch.records],
+            records,
+        ),
+    }
+
+
+def _api_versions_response():
+    return ApiVersionsResponse(
+        error_code=ErrorCode.NONE,
+        api_keys=[ApiVersionsResponse.ApiVersion(api_key, 0, 16) for api_key in (0, 1, 2, 3, 18, 75)],
+        throttle_time_ms=0,
+    )
+
+
+def _describe_topic_partitions_response():
+    return DescribeTopicPartitionsResponse(
+        topics=[
+            DescribeTopicPartitionsResponse.DescribeTopicPartitionsResponseTopic(
+                error_code=ErrorCode.NONE,
+                name="many",
+                topic_id=uuid.UUID(int=1),
+                partitions=[
+                    DescribeTopicPartitionsResponse.DescribeTopicPartitionsResponsePartition(
+                        partition_index=index,
+                        leader_id=1,
+                        leader_epoch=0,
+                        replica_nodes=[1],
+                        isr_nodes=[1],
+                        eligible_leader_replicas=[],
+                        last_known_elr=[],
+                        offline_replicas=[],
+                    )
+                    for index in range(DESCRIBE_PARTITIONS)
+                ],
+            ),
+        ],
+    )
+
+
+def _metadata_response():
+    return MetadataResponse(
+        brokers=[MetadataResponse.MetadataResponseBroker(1, "localhost", 9092)],
+        cluster_id="benchmark",
+        controller_id=1,
+        topics=[
+            MetadataResponse.MetadataResponseTopic(
+                name=f"topic-{topic:05}",
+                topic_id=uuid.UUID(int=topic + 1),
+                partitions=[
+                    MetadataResponse.MetadataResponsePartition(
+                        partition_index=index,
+                        leader_id=1,
+                        leader_epoch=0,
+                        replica_nodes=[1],
+                        isr_nodes=[1],
+                        offline_replicas=[],
+                    )
+                    for index in range(METADATA_PARTITIONS)
+                ],
+            )
+            for topic in range(METADATA_TOPICS)
+        ],
+    )
+
+
+def _fetch_response():
+    records = fixtures.batch([bytes(FETCH_RECORD_SIZE)] * FETCH_RECORDS)
+
+    return FetchResponse(
+        throttle_time_ms=0,
+        error_code=ErrorCode.NONE,
+        session_id=0,
+        responses=[
+            FetchResponse.FetchableTopicResponse(
+                topic_id=uuid.UUID(int=1),
+                partitions=[
+                    FetchResponse.PartitionData(
+                        partition_index=index,
+                        error_code=ErrorCode.NONE,
+                        high_watermark=FETCH_RECORDS,
+                        last_stable_offset=FETCH_RECORDS,
+                        log_start_offset=0,
+                        aborted_transactions=[],
+                        preferred_read_replica=-1,
+                        records=records,
+                    )
+                    for index in range(FETCH_PARTITIONS)
+                ],
+            ),
+        ],
+    )
+
+
+def _produce_response():
+    return ProduceResponse(
+        responses=[
+            ProduceResponse.TopicProduceResponse(
+                name="foo",
+                partition_responses=[
+                    ProduceResponse.PartitionProduceResponse(index, ErrorCode.NONE, 0, -1, 0, [], None)
+                    for index in range(METADATA_PARTITIONS)
+                ],
+            ),
+        ],
+        throttle_time_ms=0,
+    )
+
+
+def _list_offsets_response():
+    return ListOffsetsResponse(
+        throttle_time_ms=0,
+        topics=[
+            ListOffsetsResponse.ListOffsetsTopicResponse(
+                name="foo",
+                partitions=[
+                    ListOffsetsResponse.ListOffsetsPartitionResponse(index, ErrorCode.NONE, [], -1, 0, 0)
+                    for index in range(METADATA_PARTITIONS)
+                ],
+            ),
+        ],
+    )
+
+
+def _serialize_cases() -> typing.Dict[str, Case]:
+    messages = {
+        "ApiVersionsResponse": (_api_versions_response(), 4),
+        "DescribeTopicPartitionsResponse": (_describe_topic_partitions_response(), 0),
+        "MetadataResponse": (_metadata_response(), 12),
+        "FetchResponse": (_fetch_response(), 16),
+        "ProduceResponse": (_produce_response(), 9),
+        "ListOffsetsResponse": (_list_offsets_response(), 7),
+    }
+
+    def serialize(message, version: int):
+        writer = buffer.ByteWriter()
+        message.serialize(writer, version)
+
+        return writer.buffers
+
+    return {
+        f"{name}.serialize": Case(lambda message=message, version=version: serialize(message, version), 1)
+        for name, (message, version) in messages.items()
+    }
+
+
+def cases() -> typing.Dict[str, Case]:
+    return {
+        **_buffer_cases(),
+        **_varint_cases(),
+        **_record_cases(),
+        **_serialize_cases(),
+    }
+
+
+def _measure(case: Case) -> float:
+    timer = timeit.Timer(case.function)
+    number, _ = timer.autorange()
+
+    return min(timer.repeat(repeat=REPEAT, number=number)) / number / case.operations
+
+
+def _allocated(case: Case) -> float:
+    case.function()
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+
+        case.function()
+
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return (peak - current) / case.operations
+
+
+def run(pattern: typing.Optional[str] = None) -> dict:
+    results = {}
+
+    for name, case in cases().items():
+        if pattern is not None and pattern not in name:
+            continue
+
+        results[name] = {
+            "ns_per_op": _measure(case) * 1e9,
+            "peak_bytes_per_op": _allocated(case),
+        }
+
+    return results
+
+
+def regressions(results: dict, baseline: dict, threshold: float) -> typing.List[str]:
+    found = []
+
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+
+        for metric, slack in (("ns_per_op", 0), ("peak_bytes_per_op", ALLOCATION_SLACK)):
+            if result[metric] > previous[metric] * (1 + threshold) + slack:
+                found.append(f"{name} {metric}: {previous[metric]:.1f} -> {result[metric]:.1f}")
+
+    return found
+
+
+def _arguments(argv: typing.Optional[typing.List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python3 -m benchmarks.codec")
+    parser.add_argument("pattern", nargs="?", default=None, help="only run cases containing this string")
+    parser.add_argument("--output", default=None, help="write the results as JSON to this file")
+    parser.add_argument("--baseline", default=None, help="fail when slower than the results in this file")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+
+    return parser.parse_args(argv)
+
+
+def main(argv: typing.Optional[typing.List[str]] = None):
+    options = _arguments(argv)
+    results = run(options.pattern)
+
+    for name, result in results.items():
+        print(f"{name:<40} {result['ns_per_op']:12.1f} ns/op {result['peak_bytes_per_op']:12.1f} B/op")
+
+    if options.output is not None:
+        with open(options.output, "w") as file:
+            json.dump({"python": platform.python_version(), "results": results}, file, indent=2)
+
+    if options.baseline is not None:
+        with open(options.baseline) as file:
+            baseline = json.load(file)["results"]
+
+        found = regressions(results, baseline, options.threshold)
+        for line in found:
+            print(f"regression: {line}")
+
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
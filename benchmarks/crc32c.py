@@ -0,0 +1,53 @@
+import os
+import timeit
+
+from app import crc32c
+
+SIZES = (1024, 64 * 1024, 1024 * 1024)
+REPEAT = 5
+TOTAL_BYTES = 4 * 1024 * 1024
+
+
+def _bytewise(data: bytes):
+    table = crc32c._TABLES[0]
+    crc = 0xffffffff
+
+    for byte in data:
+        crc = table[(crc ^ byte) & 0xff] ^ (crc >> 8)
+
+    return crc ^ 0xffffffff
+
+
+def _measure(function, data: bytes):
+    number = max(1, TOTAL_BYTES // len(data) // 8)
+    return min(timeit.repeat(lambda: function(data), number=number, repeat=REPEAT)) / number
+
+
+def run():
+    results = {}
+
+    for size in SIZES:
+        data = os.urandom(size)
+        assert _bytewise(data) == crc32c.crc32c(data)
+
+        results[f"bytewise {size}"] = size / _measure(_bytewise, data)
+
+        numpy, crc32c.numpy = crc32c.numpy, None
+        try:
+            results[f"slicing-by-8 {size}"] = size / _measure(crc32c.crc32c, data)
+        finally:
+            crc32c.numpy = numpy
+
+        if numpy is not None and size >= crc32c.BULK_THRESHOLD:
+            results[f"lanes numpy {size}"] = size / _measure(crc32c.crc32c, data)
+
+    return results
+
+
+def main():
+    for name, speed in run().items():
+        print(f"{name:<24} {speed / 1e6:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import random
+import typing
+import uuid
+
+from app import buffer, crc32c, log, varint
+from app.protocol import record
+
+TIMESTAMP = 1_700_000_000_000
+
+
+def varint_values(count: int) -> typing.List[int]:
+    generator = random.Random(0)
+
+    return [
+        generator.randrange(1 << generator.choices((7, 14, 32, 63), (60, 25, 10, 5))[0])
+        for _ in range(count)
+    ]
+
+
+def batch(values: typing.List[bytes], base_offset: int = 0, timestamp: int = TIMESTAMP) -> bytes:
+    records = bytearray()
+    for offset_delta, value in enumerate(values):
+        data = b"".join((
+            b"\x00",
+            varint.encode_signed(0),
+            varint.encode_signed(offset_delta),
+            varint.encode_signed(-1),
+            varint.encode_signed(len(value)),
+            value,
+            varint.encode_unsigned(0),
+        ))
+
+        records += varint.encode_signed(len(data))
+        records += data
+
+    data = bytearray(record.BATCH_HEADER.pack(
+        base_offset,
+        record.BATCH_HEADER.size - record.LOG_OVERHEAD + len(records),
+        -1,
+        2,
+        0,
+        0,
+        len(values) - 1,
+        timestamp,
+        timestamp,
+        -1,
+        -1,
+        -1,
+        len(values),
+    ))
+    data += records
+
+    log.CRC.pack_into(data, log.CRC_OFFSET, crc32c.crc32c(memoryview(data)[log.ATTRIBUTES_OFFSET:]))
+
+    return bytes(data)
+
+
+def topic_record(name: str, topic_id: uuid.UUID) -> bytes:
+    writer = buffer.ByteWriter()
+    writer.write(b"\x01\x02\x00")
+    writer.write_compact_string(name)
+    writer.write_uuid(topic_id)
+    writer.skip_empty_tagged_field_array()
+
+    return writer.bytes
+
+
+def partition_record(index: int, topic_id: uuid.UUID, broker_id: int = 1) -> bytes:
+    writer = buffer.ByteWriter()
+    writer.write(b"\x01\x03\x01")
+    writer.write_signed_int(index)
+    writer.write_uuid(topic_id)
+
+    for replicas in ([broker_id], [broker_id], [], []):
+        writer.write_compact_array(replicas, _write_signed_int)
+
+    writer.write_signed_int(broker_id)
+    writer.write_signed_int(0)
+    writer.write_signed_int(0)
+    writer.write_compact_array([uuid.UUID(int=index)], _write_uuid)
+    writer.skip_empty_tagged_field_array()
+
+    return writer.bytes
+
+
+def metadata_log(topics: int, partitions: int) -> bytes:
+    batches = []
+    offset = 0
+
+    for index in range(topics):
+        topic_id = uuid.UUID(int=index + 1)
+
+        values = [topic_record(f"topic-{index:05}", topic_id)]
+        values.extend(partition_record(partition, topic_id) for partition in range(partitions))
+
+        batches.append(batch(values, offset))
+        offset += len(values)
+
+    return b"".join(batches)
+
+
+def _write_signed_int(value: int, writer: buffer.ByteWriter):
+    writer.write_signed_int(value)
+
+
+def _write_uuid(value: uuid.UUID, writer: buffer.ByteWriter):
+    writer.write_uuid(value)
@@ -0,0 +1,342 @@
+import argparse
+import asyncio
+import collections
+import json
+import multiprocessing
+import platform
+import struct
+import sys
+import time
+import typing
+import uuid
+
+from app import buffer
+from app.protocol.message.generated import (
+    ApiVersionsRequest,
+    DescribeTopicPartitionsRequest,
+    DescribeTopicPartitionsResponse,
+    FetchRequest,
+    ProduceRequest,
+)
+
+from . import fixtures
+
+SIZE = struct.Struct("!i")
+HEADER = struct.Struct("!hhi")
+CORRELATION_ID = struct.Struct("!i")
+CORRELATION_ID_OFFSET = 8
+
+CLIENT_ID = "kafka-load"
+CLIENT_VERSION = "0.1"
+
+APIS = {
+    "api-versions": (18, 4),
+    "describe-topic-partitions": (75, 0),
+    "fetch": (1, 16),
+    "produce": (0, 9),
+}
+
+PERCENTILES = {"p50": 0.5, "p99": 0.99, "p999": 0.999}
+
+
+class Topic(typing.NamedTuple):
+    name: str
+    id: uuid.UUID
+    partitions: typing.List[int]
+
+
+class Result(typing.NamedTuple):
+    latencies: typing.List[int]
+    response_bytes: int
+    seconds: float
+
+
+def _frame(api_key: int, api_version: int, body: bytes) -> bytes:
+    writer = buffer.ByteWriter()
+    writer.write(HEADER.pack(api_key, api_version, 0))
+    writer.write_string(CLIENT_ID)
+    writer.skip_empty_tagged_field_array()
+    writer.write(body)
+
+    data = writer.bytes
+    return SIZE.pack(len(data)) + data
+
+
+def _api_versions_body(options, topic: Topic) -> bytes:
+    writer = buffer.ByteWriter()
+    ApiVersionsRequest(CLIENT_ID, CLIENT_VERSION).serialize(writer, APIS["api-versions"][1])
+
+    return writer.bytes
+
+
+def _describe_topic_partitions_body(options, topic: Topic) -> bytes:
+    request = DescribeTopicPartitionsRequest(
+        topics=[DescribeTopicPartitionsRequest.TopicRequest(topic.name)],
+        response_partition_limit=options.partition_limit,
+    )
+
+    writer = buffer.ByteWriter()
+    request.serialize(writer, APIS["describe-topic-partitions"][1])
+
+    return writer.bytes
+
+
+def _fetch_body(options, topic: Topic) -> bytes:
+    request = FetchRequest(
+        max_wait_ms=options.max_wait_ms,
+        min_bytes=1,
+        max_bytes=options.fetch_max_bytes,
+        topics=[
+            FetchRequest.FetchTopic(
+                topic_id=topic.id,
+                partitions=[
+                    FetchRequest.FetchPartition(
+                        partition=partition,
+                        fetch_offset=options.fetch_offset,
+                        partition_max_bytes=options.fetch_max_bytes,
+                    )
+                    for partition in topic.partitions
+                ],
+            ),
+        ],
+    )
+
+    writer = buffer.ByteWriter()
+    request.serialize(writer, APIS["fetch"][1])
+
+    return writer.bytes
+
+
+def _produce_body(options, topic: Topic) -> bytes:
+    batch = fixtures.batch([bytes(options.record_size)] * options.records, timestamp=int(time.time() * 1000))
+
+    request = ProduceRequest(
+        acks=options.acks,
+        timeout_ms=options.timeout_ms,
+        topic_data=[
+            ProduceRequest.TopicProduceData(
+                name=topic.name,
+                partition_data=[
+                    ProduceRequest.PartitionProduceData(index=partition, records=batch)
+                    for partition in topic.partitions
+                ],
+            ),
+        ],
+    )
+
+    writer = buffer.ByteWriter()
+    request.serialize(writer, APIS["produce"][1])
+
+    return writer.bytes
+
+
+BODIES = {
+    "api-versions": _api_versions_body,
+    "describe-topic-partitions": _describe_topic_partitions_body,
+    "fetch": _fetch_body,
+    "produce": _produce_body,
+}
+
+
+async def _call(options, api_key: int, api_version: int, body: bytes) -> buffer.ByteReader:
+    reader, writer = await asyncio.open_connection(options.host, options.port)
+
+    try:
+        writer.write(_frame(api_key, api_version, body))
+
+        size, = SIZE.unpack(await reader.readexactly(SIZE.size))
+        return buffer.ByteReader(await reader.readexactly(size))
+    finally:
+        writer.close()
+
+
+async def _describe(options) -> Topic:
+    api_key, api_version = APIS["describe-topic-partitions"]
+    body = _describe_topic_partitions_body(options, Topic(options.topic, None, []))
+
+    reader = await _call(options, api_key, api_version, body)
+    reader.read_signed_int()
+    reader.skip_empty_tagged_field_array()
+
+    response = DescribeTopicPartitionsResponse.deserialize(reader, api_version)
+    topic, = response.topics
+
+    if topic.error_code:
+        raise SystemExit(f"{options.topic}: error {topic.error_code}")
+
+    return Topic(
+        topic.name,
+        topic.topic_id,
+        [partition.partition_index for partition in topic.partitions],
+    )
+
+
+async def _connection(options, frame: bytes, started: int, latencies: typing.List[int]) -> int:
+    reader, writer = await asyncio.open_connection(options.host, options.port)
+
+    head, tail = frame[:CORRELATION_ID_OFFSET], frame[CORRELATION_ID_OFFSET + CORRELATION_ID.size:]
+    measured = started + int(options.warmup * 1e9)
+    deadline = measured + int(options.duration * 1e9)
+
+    in_flight = asyncio.Semaphore(options.pipeline)
+    pending: typing.Deque[typing.Tuple[int, int]] = collections.deque()
+    response_bytes = 0
+
+    async def receive():
+        nonlocal response_bytes
+
+        while True:
+            size, = SIZE.unpack(await reader.readexactly(SIZE.size))
+            data = await reader.readexactly(size)
+            now = time.perf_counter_ns()
+
+            correlation_id, sent = pending.popleft()
+            if CORRELATION_ID.unpack_from(data)[0] != correlation_id:
+                raise RuntimeError(f"unexpected correlation id, wanted {correlation_id}")
+
+            if sent >= measured:
+                latencies.append(now - sent)
+                response_bytes += SIZE.size + size
+
+            in_flight.release()
+
+    async def send():
+        correlation_id = 0
+
+        while True:
+            await in_flight.acquire()
+
+            now = time.perf_counter_ns()
+            if now >= deadline:
+                in_flight.release()
+                break
+
+            correlation_id += 1
+            pending.append((correlation_id, now))
+
+            writer.writelines((head, CORRELATION_ID.pack(correlation_id), tail))
+            await writer.drain()
+
+        for _ in range(options.pipeline):
+            await in_flight.acquire()
+
+    receiver = asyncio.create_task(receive())
+    sender = asyncio.create_task(send())
+
+    try:
+        done, _ = await asyncio.wait((receiver, sender), return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    finally:
+        receiver.cancel()
+        sender.cancel()
+        writer.close()
+
+    return response_bytes
+
+
+async def _load(options, frame: bytes, connections: int) -> Result:
+    latencies: typing.List[int] = []
+    started = time.perf_counter_ns()
+
+    response_bytes = await asyncio.gather(*(
+        _connection(options, frame, started, latencies)
+        for _ in range(connections)
+    ))
+
+    return Result(latencies, sum(response_bytes), options.duration)
+
+
+def _process(arguments) -> Result:
+    options, frame, connections = arguments
+    return asyncio.run(_load(options, frame, connections))
+
+
+def _percentile(latencies: typing.List[int], fraction: float) -> float:
+    index = min(len(latencies) - 1, int(fraction * len(latencies)))
+    return latencies[index] / 1e6
+
+
+def run(options) -> dict:
+    api_key, api_version = APIS[options.api]
+
+    topic = asyncio.run(_describe(options))
+    frame = _frame(api_key, api_version, BODIES[options.api](options, topic))
+
+    processes = min(options.processes, options.connections)
+    shares = [
+        (options, frame, options.connections // processes + (index < options.connections % processes))
+        for index in range(processes)
+    ]
+
+    if processes == 1:
+        results = [_process(shares[0])]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(_process, shares)
+
+    latencies = sorted(latency for result in results for latency in result.latencies)
+    if not latencies:
+        raise SystemExit("no responses received")
+
+    return {
+        "label": options.label,
+        "api": options.api,
+        "api_version": api_version,
+        "topic": topic.name,
+        "partitions": len(topic.partitions),
+        "connections": options.connections,
+        "pipeline": options.pipeline,
+        "processes": processes,
+        "duration": options.duration,
+        "warmup": options.warmup,
+        "request_bytes": len(frame),
+        "requests": len(latencies),
+        "requests_per_second": sum(len(result.latencies) / result.seconds for result in results),
+        "response_bytes_per_second": sum(result.response_bytes / result.seconds for result in results),
+        "latency_ms": {
+            **{name: _percentile(latencies, fraction) for name, fraction in PERCENTILES.items()},
+            "max": latencies[-1] / 1e6,
+        },
+        "python": platform.python_version(),
+    }
+
+
+def _arguments(argv: typing.Optional[typing.List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python3 -m benchmarks.load")
+    parser.add_argument("api", choices=sorted(APIS))
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=9092)
+    parser.add_argument("--topic", default="foo")
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--pipeline", type=int, default=1, help="requests in flight per connection")
+    parser.add_argument("--processes", type=int, default=1, help="client processes sharing the connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=1.0, help="seconds before measuring")
+    parser.add_argument("--partition-limit", type=int, default=2000)
+    parser.add_argument("--fetch-offset", type=int, default=0)
+    parser.add_argument("--fetch-max-bytes", type=int, default=1024 * 1024)
+    parser.add_argument("--max-wait-ms", type=int, default=0)
+    parser.add_argument("--records", type=int, default=10, help="records per produced batch")
+    parser.add_argument("--record-size", type=int, default=100, help="bytes per produced record value")
+    parser.add_argument("--acks", type=int, choices=(-1, 1), default=1)
+    parser.add_argument("--timeout-ms", type=int, default=30000)
+    parser.add_argument("--label", default=None, help="free-form tag copied into the report")
+    parser.add_argument("--output", default=None, help="write the JSON report to this file")
+
+    return parser.parse_args(argv)
+
+
+def main(argv: typing.Optional[typing.List[str]] = None):
+    options = _arguments(argv)
+    report = json.dumps(run(options), indent=2)
+
+    if options.output is None:
+        print(report)
+    else:
+        with open(options.output, "w") as file:
+            print(report, file=file)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,92 @@
+import io
+import timeit
+
+from app import varint
+
+from . import fixtures
+
+COUNT = 10_000
+REPEAT = 5
+
+
+def _stream_decode(data: bytes):
+    stream = io.BytesIO(data)
+    return [varint.read_unsigned_long(stream) for _ in range(COUNT)]
+
+
+def _buffer_decode(data: bytes):
+    view = memoryview(data)
+    values = []
+
+    offset = 0
+    for _ in range(COUNT):
+        value, offset = varint.decode_unsigned(view, offset)
+        values.append(value)
+
+    return values
+
+
+def _bulk_decode(data: bytes):
+    values, _ = varint.decode_unsigned_many(memoryview(data), 0, COUNT)
+    return values
+
+
+def _stream_encode(values):
+    stream = io.BytesIO()
+
+    for value in values:
+        varint.write_unsigned_long(stream, value)
+
+    return stream.getvalue()
+
+
+def _buffer_encode(values):
+    data = bytearray(sum(map(varint.unsigned_size, values)))
+
+    offset = 0
+    for value in values:
+        offset = varint.encode_unsigned_into(data, offset, value)
+
+    return bytes(data)
+
+
+def _measure(function, argument):
+    return min(timeit.repeat(lambda: function(argument), number=1, repeat=REPEAT))
+
+
+def run():
+    values = fixtures.varint_values(COUNT)
+    data = _buffer_encode(values)
+
+    assert _stream_decode(data) == values
+    assert _buffer_decode(data) == values
+    assert _bulk_decode(data) == values
+    assert _stream_encode(values) == data
+
+    results = {
+        "decode stream": _measure(_stream_decode, data),
+        "decode buffer": _measure(_buffer_decode, data),
+    }
+
+    numpy, varint.numpy = varint.numpy, None
+    try:
+        results["decode bulk"] = _measure(_bulk_decode, data)
+    finally:
+        varint.numpy = numpy
+
+    if numpy is not None:
+        results["decode bulk numpy"] = _measure(_bulk_decode, data)
+
+    results["encode stream"] = _measure(_stream_encode, values)
+    results["encode buffer"] = _measure(_buffer_encode, values)
+
+    return results
+
+
+def main():
+    for name, seconds in run().items():
+        print(f"{name:<20} {seconds * 1e9 / COUNT:8.1f} ns/varint")
+
+
+if __name__ == "__main__":
+    main()
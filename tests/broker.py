@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+import unittest.mock
+import uuid
+
+from app import cache, flusher, log, main, metadata, purgatory, session
+from app.protocol.message import Request, RequestHeaderV2
+from benchmarks import fixtures
+
+
+def topic_name(index: int) -> str:
+    return f"topic-{index:05}"
+
+
+def topic_id(index: int) -> uuid.UUID:
+    return uuid.UUID(int=index + 1)
+
+
+def start(test: unittest.TestCase, topics: int = 1, partitions: int = 1) -> str:
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+
+    metadata_directory = os.path.join(directory.name, "__cluster_metadata-0")
+    os.makedirs(metadata_directory)
+
+    with open(log.segment_path(metadata_directory, 0, ".log"), "wb") as file:
+        file.write(fixtures.metadata_log(topics, partitions))
+
+    logs = {}
+    test.addCleanup(lambda: [partition_log.close() for partition_log in logs.values()])
+
+    for name, value in (
+        ("LOG_DIRECTORY", directory.name),
+        ("metadata_image", metadata.MetadataImage(metadata_directory)),
+        ("log_flusher", flusher.Flusher()),
+        ("fetch_purgatory", purgatory.Purgatory()),
+        ("fetch_sessions", session.SessionCache(max_sessions=16)),
+        ("response_cache", cache.ResponseCache(max_entries=0)),
+        ("_metadata_topic_tables", (-1, ({}, {}))),
+        ("_logs", logs),
+    ):
+        patcher = unittest.mock.patch.object(main, name, value)
+        patcher.start()
+        test.addCleanup(patcher.stop)
+
+    main.metadata_image.refresh()
+
+    return directory.name
+
+
+def request(api_key: int, api_version: int, body, correlation_id: int = 1) -> Request:
+    return Request(RequestHeaderV2(api_key, api_version, correlation_id, "test"), body)
@@ -0,0 +1,469 @@
+import struct
+import tempfile
+import unittest
+import uuid
+
+from app import buffer, varint
+from app.protocol.message import (
+    ApiVersionsRequest,
+    ApiVersionsResponse,
+    DescribeTopicPartitionsRequest,
+    DescribeTopicPartitionsResponse,
+    FetchRequest,
+    FetchResponse,
+    ListOffsetsRequest,
+    ListOffsetsResponse,
+    ProduceRequest,
+    ProduceResponse,
+)
+from benchmarks import fixtures
+
+TOPIC_ID = uuid.UUID(int=1)
+OTHER_TOPIC_ID = uuid.UUID(int=2)
+RECORDS = fixtures.batch([b"value"] * 3)
+
+
+def _pack(format: str, *values) -> bytes:
+    return struct.pack(f"!{format}", *values)
+
+
+def _uvarint(value: int) -> bytes:
+    return varint.encode_unsigned(value)
+
+
+def _string(value) -> bytes:
+    if value is None:
+        return _pack("h", -1)
+
+    return _pack("h", len(value)) + value.encode()
+
+
+def _compact_string(value) -> bytes:
+    if value is None:
+        return _uvarint(0)
+
+    return _uvarint(len(value) + 1) + value.encode()
+
+
+def _array(*items: bytes) -> bytes:
+    return _pack("i", len(items)) + b"".join(items)
+
+
+def _compact_array(*items: bytes) -> bytes:
+    return _uvarint(len(items) + 1) + b"".join(items)
+
+
+NO_TAGS = _uvarint(0)
+
+
+def _tags(*fields) -> bytes:
+    return _uvarint(len(fields)) + b"".join(_uvarint(tag) + _uvarint(len(data)) + data for tag, data in fields)
+
+
+CASES = [
+    (ApiVersionsRequest, 2, b"", ApiVersionsRequest()),
+    (
+        ApiVersionsRequest, 3,
+        _compact_string("kafka-cli") + _compact_string("1.0") + NO_TAGS,
+        ApiVersionsRequest("kafka-cli", "1.0"),
+    ),
+    (
+        ApiVersionsResponse, 0,
+        _pack("h", 0) + _array(_pack("hhh", 0, 3, 11), _pack("hhh", 1, 4, 16)),
+        ApiVersionsResponse(
+            error_code=0,
+            api_keys=[ApiVersionsResponse.ApiVersion(0, 3, 11), ApiVersionsResponse.ApiVersion(1, 4, 16)],
+        ),
+    ),
+    (
+        ApiVersionsResponse, 3,
+        _pack("h", 0)
+        + _compact_array(_pack("hhh", 0, 3, 11) + NO_TAGS, _pack("hhh", 1, 4, 16) + NO_TAGS)
+        + _pack("i", 10)
+        + _tags((1, _pack("q", 5))),
+        ApiVersionsResponse(
+            error_code=0,
+            api_keys=[ApiVersionsResponse.ApiVersion(0, 3, 11), ApiVersionsResponse.ApiVersion(1, 4, 16)],
+            throttle_time_ms=10,
+            finalized_features_epoch=5,
+        ),
+    ),
+    (
+        DescribeTopicPartitionsRequest, 0,
+        _compact_array(_compact_string("foo") + NO_TAGS)
+        + _pack("i", 10)
+        + _pack("b", 1) + _compact_string("foo") + _pack("i", 1) + NO_TAGS
+        + NO_TAGS,
+        DescribeTopicPartitionsRequest(
+            topics=[DescribeTopicPartitionsRequest.TopicRequest("foo")],
+            response_partition_limit=10,
+            cursor=DescribeTopicPartitionsRequest.Cursor("foo", 1),
+        ),
+    ),
+    (
+        DescribeTopicPartitionsResponse, 0,
+        _pack("i", 0)
+        + _compact_array(
+            _pack("h", 0) + _compact_string("foo") + TOPIC_ID.bytes + _pack("?", False)
+            + _compact_array(
+                _pack("hiii", 0, 1, 2, 3)
+                + _compact_array(_pack("i", 2)) + _compact_array(_pack("i", 2))
+                + _uvarint(0) + _compact_array()
+                + _compact_array()
+                + NO_TAGS
+            )
+            + _pack("i", -2 ** 31)
+            + NO_TAGS
+        )
+        + _pack("b", -1)
+        + NO_TAGS,
+        DescribeTopicPartitionsResponse(
+            topics=[
+                DescribeTopicPartitionsResponse.DescribeTopicPartitionsResponseTopic(
+                    error_code=0,
+                    name="foo",
+                    topic_id=TOPIC_ID,
+                    partitions=[
+                        DescribeTopicPartitionsResponse.DescribeTopicPartitionsResponsePartition(
+                            partition_index=1,
+                            leader_id=2,
+                            leader_epoch=3,
+                            replica_nodes=[2],
+                            isr_nodes=[2],
+                            eligible_leader_replicas=None,
+                            last_known_elr=[],
+                            offline_replicas=[],
+                        ),
+                    ],
+                ),
+            ],
+        ),
+    ),
+    (
+        FetchRequest, 4,
+        _pack("iiiib", -1, 500, 1, 1 << 20, 0)
+        + _array(_string("foo") + _array(_pack("iqi", 0, 7, 65536))),
+        FetchRequest(
+            max_wait_ms=500,
+            min_bytes=1,
+            max_bytes=1 << 20,
+            topics=[
+                FetchRequest.FetchTopic(
+                    topic="foo",
+                    partitions=[FetchRequest.FetchPartition(partition=0, fetch_offset=7, partition_max_bytes=65536)],
+                ),
+            ],
+        ),
+    ),
+    (
+        FetchRequest, 16,
+        _pack("iiibii", 500, 1, 1 << 20, 1, 12, 3)
+        + _compact_array(TOPIC_ID.bytes + _compact_array(_pack("iiqiqi", 0, 4, 7, 2, 0, 65536) + NO_TAGS) + NO_TAGS)
+        + _compact_array(OTHER_TOPIC_ID.bytes + _compact_array(_pack("i", 1), _pack("i", 2)) + NO_TAGS)
+        + _compact_string("rack")
+        + _tags((0, _compact_string("cluster"))),
+        FetchRequest(
+            cluster_id="cluster",
+            max_wait_ms=500,
+            min_bytes=1,
+            max_bytes=1 << 20,
+            isolation_level=1,
+            session_id=12,
+            session_epoch=3,
+            topics=[
+                FetchRequest.FetchTopic(
+                    topic_id=TOPIC_ID,
+                    partitions=[
+                        FetchRequest.FetchPartition(
+                            partition=0,
+                            current_leader_epoch=4,
+                            fetch_offset=7,
+                            last_fetched_epoch=2,
+                            log_start_offset=0,
+                            partition_max_bytes=65536,
+                        ),
+                    ],
+                ),
+            ],
+            forgotten_topics_data=[FetchRequest.ForgottenTopic(topic_id=OTHER_TOPIC_ID, partitions=[1, 2])],
+            rack_id="rack",
+        ),
+    ),
+    (
+        FetchResponse, 4,
+        _pack("i", 0)
+        + _array(_string("foo") + _array(_pack("ihqq", 0, 0, 8, 8) + _array() + _pack("i", len(RECORDS)) + RECORDS)),
+        FetchResponse(
+            responses=[
+                FetchResponse.FetchableTopicResponse(
+                    topic="foo",
+                    partitions=[
+                        FetchResponse.PartitionData(
+                            partition_index=0,
+                            high_watermark=8,
+                            last_stable_offset=8,
+                            aborted_transactions=[],
+                            records=RECORDS,
+                        ),
+                    ],
+                ),
+            ],
+        ),
+    ),
+    (
+        FetchResponse, 12,
+        _pack("ihi", 0, 0, 5)
+        + _compact_array(
+            _compact_string("foo")
+            + _compact_array(
+                _pack("ihqqq", 0, 0, 8, 8, 0) + _compact_array() + _pack("i", -1)
+                + _uvarint(len(RECORDS) + 1) + RECORDS
+                + _tags((1, _pack("ii", 1, 5) + NO_TAGS))
+            )
+            + NO_TAGS
+        )
+        + NO_TAGS,
+        FetchResponse(
+            session_id=5,
+            responses=[
+                FetchResponse.FetchableTopicResponse(
+                    topic="foo",
+                    partitions=[
+                        FetchResponse.PartitionData(
+                            partition_index=0,
+                            high_watermark=8,
+                            last_stable_offset=8,
+                            log_start_offset=0,
+                            current_leader=FetchResponse.LeaderIdAndEpoch(1, 5),
+                            aborted_transactions=[],
+                            records=RECORDS,
+                        ),
+                    ],
+                ),
+            ],
+        ),
+    ),
+    (
+        FetchResponse, 16,
+        _pack("ihi", 0, 70, 0)
+        + _compact_array(
+            TOPIC_ID.bytes
+            + _compact_array(_pack("ihqqq", 0, 3, -1, -1, -1) + _uvarint(0) + _pack("i", -1) + _uvarint(0) + NO_TAGS)
+            + NO_TAGS
+        )
+        + NO_TAGS,
+        FetchResponse(
+            error_code=70,
+            responses=[
+                FetchResponse.FetchableTopicResponse(
+                    topic_id=TOPIC_ID,
+                    partitions=[
+                        FetchResponse.PartitionData(
+                            partition_index=0,
+                            error_code=3,
+                            high_watermark=-1,
+                            aborted_transactions=None,
+                            records=None,
+                        ),
+                    ],
+                ),
+            ],
+        ),
+    ),
+    (
+        ProduceRequest, 3,
+        _string(None) + _pack("hi", -1, 1000)
+        + _array(_string("foo") + _array(_pack("i", 0) + _pack("i", len(RECORDS)) + RECORDS)),
+        ProduceRequest(
+            acks=-1,
+            timeout_ms=1000,
+            topic_data=[ProduceRequest.TopicProduceData("foo", [ProduceRequest.PartitionProduceData(0, RECORDS)])],
+        ),
+    ),
+    (
+        ProduceRequest, 9,
+        _compact_string("tx") + _pack("hi", 1, 1000)
+        + _compact_array(
+            _compact_string("foo")
+            + _compact_array(_pack("i", 0) + _uvarint(len(RECORDS) + 1) + RECORDS + NO_TAGS)
+            + NO_TAGS
+        )
+        + NO_TAGS,
+        ProduceRequest(
+            transactional_id="tx",
+            acks=1,
+            timeout_ms=1000,
+            topic_data=[ProduceRequest.TopicProduceData("foo", [ProduceRequest.PartitionProduceData(0, RECORDS)])],
+        ),
+    ),
+    (
+        ProduceResponse, 3,
+        _array(_string("foo") + _array(_pack("ihqq", 0, 0, 42, -1))) + _pack("i", 0),
+        ProduceResponse(
+            responses=[
+                ProduceResponse.TopicProduceResponse(
+                    "foo",
+                    [ProduceResponse.PartitionProduceResponse(index=0, error_code=0, base_offset=42)],
+                ),
+            ],
+        ),
+    ),
+    (
+        ProduceResponse, 9,
+        _compact_array(
+            _compact_string("foo")
+            + _compact_array(
+                _pack("ihqqq", 0, 2, -1, -1, -1)
+                + _compact_array(_pack("i", 0) + _compact_string("bad crc") + NO_TAGS)
+                + _compact_string("corrupt")
+                + NO_TAGS
+            )
+            + NO_TAGS
+        )
+        + _pack("i", 0)
+        + NO_TAGS,
+        ProduceResponse(
+            responses=[
+                ProduceResponse.TopicProduceResponse(
+                    "foo",
+                    [
+                        ProduceResponse.PartitionProduceResponse(
+                            index=0,
+                            error_code=2,
+                            base_offset=-1,
+                            record_errors=[ProduceResponse.BatchIndexAndErrorMessage(0, "bad crc")],
+                            error_message="corrupt",
+                        ),
+                    ],
+                ),
+            ],
+        ),
+    ),
+    (
+        ListOffsetsRequest, 1,
+        _pack("i", -1) + _array(_string("foo") + _array(_pack("iq", 0, -1))),
+        ListOffsetsRequest(
+            replica_id=-1,
+            topics=[ListOffsetsRequest.ListOffsetsTopic("foo", [ListOffsetsRequest.ListOffsetsPartition(partition_index=0, timestamp=-1)])],
+        ),
+    ),
+    (
+        ListOffsetsRequest, 7,
+        _pack("ib", -1, 1)
+        + _compact_array(_compact_string("foo") + _compact_array(_pack("iiq", 0, 3, -2) + NO_TAGS) + NO_TAGS)
+        + NO_TAGS,
+        ListOffsetsRequest(
+            replica_id=-1,
+            isolation_level=1,
+            topics=[
+                ListOffsetsRequest.ListOffsetsTopic(
+                    "foo",
+                    [ListOffsetsRequest.ListOffsetsPartition(partition_index=0, current_leader_epoch=3, timestamp=-2)],
+                ),
+            ],
+        ),
+    ),
+    (
+        ListOffsetsResponse, 1,
+        _array(_string("foo") + _array(_pack("ihqq", 0, 0, -1, 42))),
+        ListOffsetsResponse(
+            topics=[
+                ListOffsetsResponse.ListOffsetsTopicResponse(
+                    "foo",
+                    [ListOffsetsResponse.ListOffsetsPartitionResponse(partition_index=0, error_code=0, offset=42)],
+                ),
+            ],
+        ),
+    ),
+    (
+        ListOffsetsResponse, 7,
+        _pack("i", 0)
+        + _compact_array(_compact_string("foo") + _compact_array(_pack("ihqqi", 0, 0, 1000, 42, 0) + NO_TAGS) + NO_TAGS)
+        + NO_TAGS,
+        ListOffsetsResponse(
+            topics=[
+                ListOffsetsResponse.ListOffsetsTopicResponse(
+                    "foo",
+                    [
+                        ListOffsetsResponse.ListOffsetsPartitionResponse(
+                            partition_index=0,
+                            error_code=0,
+                            timestamp=1000,
+                            offset=42,
+                            leader_epoch=0,
+                        ),
+                    ],
+                ),
+            ],
+        ),
+    ),
+]
+
+
+def _serialize(message, version: int) -> bytes:
+    writer = buffer.ByteWriter()
+    message.serialize(writer, version)
+
+    return b"".join(item.read() if isinstance(item, buffer.FileRegion) else bytes(item) for item in writer.buffers)
+
+
+class CodegenTest(unittest.TestCase):
+
+    def test_decodes_hand_built_frames(self):
+        for message_type, version, data, expected in CASES:
+            with self.subTest(message=message_type.__name__, version=version):
+                reader = buffer.ByteReader(data)
+
+                self.assertEqual(message_type.deserialize(reader, version), expected)
+                self.assertTrue(reader.eof)
+
+    def test_encodes_hand_built_frames(self):
+        for message_type, version, data, message in CASES:
+            with self.subTest(message=message_type.__name__, version=version):
+                self.assertEqual(_serialize(message, version), data)
+
+    def test_round_trips(self):
+        for message_type, version, data, _ in CASES:
+            with self.subTest(message=message_type.__name__, version=version):
+                message = message_type.deserialize(buffer.ByteReader(data), version)
+
+                self.assertEqual(_serialize(message, version), data)
+
+    def test_covers_flexible_and_non_flexible_versions(self):
+        versions = {}
+        for message_type, version, _, _ in CASES:
+            versions.setdefault(message_type, set()).add(version in message_type.FLEXIBLE_VERSIONS)
+
+        for message_type, flexible in versions.items():
+            with self.subTest(message=message_type.__name__):
+                expected = {version in message_type.FLEXIBLE_VERSIONS for version in message_type.VERSIONS}
+                self.assertEqual(flexible, expected)
+
+    def test_records_are_sent_as_file_regions(self):
+        with tempfile.TemporaryFile() as file:
+            file.write(bytes(8192) + RECORDS)
+            file.flush()
+
+            region = buffer.FileRegion(file, 8192, len(RECORDS))
+            response = FetchResponse(
+                responses=[
+                    FetchResponse.FetchableTopicResponse(
+                        topic_id=TOPIC_ID,
+                        partitions=[FetchResponse.PartitionData(partition_index=0, records=region)],
+                    ),
+                ],
+            )
+
+            writer = buffer.ByteWriter()
+            response.serialize(writer, 16)
+
+            self.assertIn(region, writer.buffers)
+
+            data = _serialize(response, 16)
+            decoded = FetchResponse.deserialize(buffer.ByteReader(data), 16)
+
+            self.assertEqual(decoded.responses[0].partitions[0].records, RECORDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
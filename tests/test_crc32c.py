@@ -0,0 +1,92 @@
+import random
+import unittest
+
+from app import crc32c
+
+# RFC 3720, appendix B.4.
+VECTORS = [
+    (bytes(32), 0x8A9136AA),
+    (b"\xff" * 32, 0x62A8AB43),
+    (bytes(range(32)), 0x46DD794E),
+    (bytes(range(31, -1, -1)), 0x113FDB5C),
+    (b"123456789", 0xE3069283),
+    (b"", 0),
+]
+
+
+class ScalarTest(unittest.TestCase):
+
+    def setUp(self):
+        self.numpy, crc32c.numpy = crc32c.numpy, None
+
+    def tearDown(self):
+        crc32c.numpy = self.numpy
+
+    def test_vectors(self):
+        for data, expected in VECTORS:
+            with self.subTest(data=data):
+                self.assertEqual(crc32c.crc32c(data), expected)
+
+    def test_unaligned_lengths(self):
+        data = bytes(range(256)) * 2
+
+        for size in range(len(data)):
+            with self.subTest(size=size):
+                self.assertEqual(crc32c.crc32c(data[:size]), _bytewise(data[:size]))
+
+    def test_incremental(self):
+        data = b"123456789"
+
+        for split in range(len(data) + 1):
+            with self.subTest(split=split):
+                self.assertEqual(crc32c.crc32c(data[split:], crc32c.crc32c(data[:split])), 0xE3069283)
+
+
+@unittest.skipIf(crc32c.numpy is None, "numpy is not installed")
+class LanesTest(unittest.TestCase):
+
+    def test_vectors(self):
+        for data, expected in VECTORS:
+            data = data * (crc32c.BULK_THRESHOLD // max(len(data), 1) + 1)
+
+            numpy, crc32c.numpy = crc32c.numpy, None
+            try:
+                expected = crc32c.crc32c(data)
+            finally:
+                crc32c.numpy = numpy
+
+            with self.subTest(size=len(data)):
+                self.assertEqual(crc32c.crc32c(data), expected)
+
+    def test_matches_scalar(self):
+        generator = random.Random(0)
+        data = bytes(generator.getrandbits(8) for _ in range(3 * crc32c.BULK_THRESHOLD))
+
+        sizes = [crc32c.BULK_THRESHOLD + delta for delta in range(-1, 2 * crc32c.LANE_SIZE + 1)]
+        sizes += [generator.randrange(crc32c.BULK_THRESHOLD, len(data)) for _ in range(32)]
+
+        for size in sizes:
+            lanes = crc32c.crc32c(data[:size], 0x12345678)
+
+            numpy, crc32c.numpy = crc32c.numpy, None
+            try:
+                scalar = crc32c.crc32c(data[:size], 0x12345678)
+            finally:
+                crc32c.numpy = numpy
+
+            with self.subTest(size=size):
+                self.assertEqual(lanes, scalar)
+
+
+def _bytewise(data: bytes) -> int:
+    table = crc32c._TABLES[0]
+    crc = 0xffffffff
+
+    for byte in data:
+        crc = table[(crc ^ byte) & 0xff] ^ (crc >> 8)
+
+    return crc ^ 0xffffffff
+
+
+if __name__ == "__main__":
+    unittest.main()
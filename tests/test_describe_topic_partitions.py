@@ -0,0 +1,126 @@
+import unittest
+import unittest.mock
+
+from app import main, protocol
+from app.protocol.message import DescribeTopicPartitionsRequest
+
+from . import broker
+
+TOPICS = 3
+PARTITIONS = 4
+
+
+def _describe(limit: int, cursor=None, topics=()):
+    return main._handle_describe_topic_partitions(DescribeTopicPartitionsRequest(
+        topics=[DescribeTopicPartitionsRequest.TopicRequest(name) for name in topics],
+        response_partition_limit=limit,
+        cursor=cursor,
+    ))
+
+
+def _listed(response):
+    return [
+        (topic.name, partition.partition_index)
+        for topic in response.topics
+        for partition in topic.partitions
+    ]
+
+
+def _cursor(response):
+    if response.next_cursor is None:
+        return None
+
+    return (response.next_cursor.topic_name, response.next_cursor.partition_index)
+
+
+class DescribeTopicPartitionsTest(unittest.TestCase):
+
+    def setUp(self):
+        broker.start(self, topics=TOPICS, partitions=PARTITIONS)
+
+    def test_lists_every_partition_in_order(self):
+        response = _describe(TOPICS * PARTITIONS)
+
+        self.assertEqual(_listed(response), [
+            (broker.topic_name(topic), partition)
+            for topic in range(TOPICS)
+            for partition in range(PARTITIONS)
+        ])
+        self.assertIsNone(response.next_cursor)
+
+    def test_limit_at_partition_boundary(self):
+        response = _describe(PARTITIONS)
+
+        self.assertEqual(_listed(response), [(broker.topic_name(0), partition) for partition in range(PARTITIONS)])
+        self.assertEqual(_cursor(response), (broker.topic_name(1), 0))
+
+    def test_limit_inside_topic(self):
+        response = _describe(PARTITIONS - 1)
+
+        self.assertEqual(_listed(response), [(broker.topic_name(0), partition) for partition in range(PARTITIONS - 1)])
+        self.assertEqual(_cursor(response), (broker.topic_name(0), PARTITIONS - 1))
+
+    def test_limit_across_topics(self):
+        response = _describe(PARTITIONS + 2)
+
+        self.assertEqual([topic.name for topic in response.topics], [broker.topic_name(0), broker.topic_name(1)])
+        self.assertEqual(_listed(response)[PARTITIONS:], [(broker.topic_name(1), 0), (broker.topic_name(1), 1)])
+        self.assertEqual(_cursor(response), (broker.topic_name(1), 2))
+
+    def test_limit_ending_on_last_partition(self):
+        cursor = DescribeTopicPartitionsRequest.Cursor(broker.topic_name(TOPICS - 1), 0)
+        response = _describe(PARTITIONS, cursor)
+
+        self.assertEqual(len(_listed(response)), PARTITIONS)
+        self.assertIsNone(response.next_cursor)
+
+    def test_non_positive_limit_uses_server_maximum(self):
+        with unittest.mock.patch.object(main, "DESCRIBE_TOPIC_PARTITIONS_LIMIT", PARTITIONS + 1):
+            for limit in (0, -1, 100):
+                with self.subTest(limit=limit):
+                    response = _describe(limit)
+
+                    self.assertEqual(len(_listed(response)), PARTITIONS + 1)
+                    self.assertEqual(_cursor(response), (broker.topic_name(1), 1))
+
+    def test_next_cursor_round_trip(self):
+        for limit in range(1, TOPICS * PARTITIONS + 1):
+            with self.subTest(limit=limit):
+                listed = []
+                cursor = None
+
+                while True:
+                    response = _describe(limit, cursor)
+
+                    page = _listed(response)
+                    self.assertLessEqual(len(page), limit)
+                    listed.extend(page)
+
+                    if response.next_cursor is None:
+                        break
+
+                    self.assertEqual(len(page), limit)
+                    cursor = DescribeTopicPartitionsRequest.Cursor(*_cursor(response))
+
+                self.assertEqual(listed, _listed(_describe(TOPICS * PARTITIONS)))
+
+    def test_cursor_over_requested_topics(self):
+        names = [broker.topic_name(2), "missing", broker.topic_name(0)]
+
+        response = _describe(PARTITIONS + 1, topics=names)
+        self.assertEqual(_listed(response), [
+            *((broker.topic_name(0), partition) for partition in range(PARTITIONS)),
+            (broker.topic_name(2), 0),
+        ])
+        self.assertEqual(response.topics[0].name, "missing")
+        self.assertEqual(response.topics[0].error_code, protocol.ErrorCode.UNKNOWN_TOPIC)
+        self.assertEqual(_cursor(response), (broker.topic_name(2), 1))
+
+        cursor = DescribeTopicPartitionsRequest.Cursor(*_cursor(response))
+        response = _describe(PARTITIONS + 1, cursor, names)
+        self.assertEqual(_listed(response), [(broker.topic_name(2), partition) for partition in range(1, PARTITIONS)])
+        self.assertIsNone(response.next_cursor)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+import os
+import tempfile
+import unittest
+
+from app import log
+from app.protocol import record
+from benchmarks import fixtures
+
+RECORD_SIZE = 1024
+
+
+def _batch(records: int = 1) -> bytes:
+    return fixtures.batch([bytes(RECORD_SIZE)] * records)
+
+
+def _base_offsets(data: bytes):
+    offsets = []
+
+    position = 0
+    while position < len(data):
+        base_offset, batch_length, *_ = record.BATCH_HEADER.unpack_from(data, position)
+
+        offsets.append(base_offset)
+        position += record.LOG_OVERHEAD + batch_length
+
+    return offsets
+
+
+class LogTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        self.directory = directory.name
+
+    def open(self, segment_bytes: int = log.DEFAULT_SEGMENT_BYTES):
+        partition_log = log.Log(self.directory, segment_bytes)
+        self.addCleanup(partition_log.close)
+
+        return partition_log
+
+    def segment_files(self, suffix: str = ".log"):
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(suffix))
+
+    def test_rolls_by_size(self):
+        size = len(_batch())
+        partition_log = self.open(segment_bytes=2 * size + size // 2)
+
+        appended = [partition_log.append(_batch()) for _ in range(5)]
+
+        self.assertEqual(appended, [(offset, offset + 1) for offset in range(5)])
+        self.assertEqual([segment.base_offset for segment in partition_log.segments], [0, 2, 4])
+        self.assertEqual(self.segment_files(), [log.segment_path("", offset, ".log") for offset in (0, 2, 4)])
+        self.assertEqual([segment.size for segment in partition_log.segments], [2 * size, 2 * size, size])
+
+        reopened = log.Log(self.directory, partition_log.segment_bytes)
+        self.addCleanup(reopened.close)
+
+        self.assertEqual([segment.base_offset for segment in reopened.segments], [0, 2, 4])
+        self.assertEqual(reopened.next_offset, 5)
+
+    def test_read_crosses_segment_boundaries(self):
+        size = len(_batch())
+        partition_log = self.open(segment_bytes=2 * size)
+
+        for _ in range(5):
+            partition_log.append(_batch())
+
+        self.assertEqual(_base_offsets(partition_log.read(1, 10 * size).read()), [1, 2, 3, 4])
+        self.assertEqual(_base_offsets(partition_log.read(1, 2 * size).read()), [1, 2])
+        self.assertEqual(_base_offsets(partition_log.read(4, 10 * size).read()), [4])
+        self.assertEqual(len(partition_log.read(5, 10 * size)), 0)
+        self.assertIsNone(partition_log.read(6, 10 * size))
+
+    def test_rebuilds_deleted_index(self):
+        size = len(_batch())
+        partition_log = self.open(segment_bytes=20 * size)
+
+        for _ in range(30):
+            partition_log.append(_batch())
+
+        partition_log.close()
+
+        index_paths = [os.path.join(self.directory, name) for name in self.segment_files(".index")]
+        indexes = []
+        for path in index_paths:
+            with open(path, "rb") as file:
+                indexes.append(file.read())
+
+        self.assertEqual(len(index_paths), 2)
+        self.assertGreater(len(indexes[0]), log.OffsetIndex.ENTRY.size)
+
+        for path in index_paths:
+            os.remove(path)
+
+        reopened = self.open(segment_bytes=20 * size)
+
+        self.assertEqual(reopened.next_offset, 30)
+        for path, expected in zip(index_paths, indexes):
+            with open(path, "rb") as file:
+                self.assertEqual(file.read(), expected)
+
+        for offset in (0, 7, 19, 20, 29):
+            with self.subTest(offset=offset):
+                self.assertEqual(_base_offsets(reopened.read(offset, size).read()), [offset])
+
+    def test_truncates_corrupted_tail_batch(self):
+        size = len(_batch())
+        partition_log = self.open()
+
+        for _ in range(3):
+            partition_log.append(_batch())
+
+        partition_log.close()
+
+        path = log.segment_path(self.directory, 0, ".log")
+        with open(path, "r+b") as file:
+            file.seek(2 * size + record.BATCH_HEADER.size + 10)
+            file.write(b"\xff")
+
+        reopened = self.open()
+
+        self.assertEqual(os.path.getsize(path), 2 * size)
+        self.assertEqual(reopened.next_offset, 2)
+        self.assertEqual(reopened.append(_batch()), (2, 3))
+        self.assertEqual(_base_offsets(reopened.read(0, 10 * size).read()), [0, 1, 2])
+
+    def test_truncates_torn_tail_batch(self):
+        size = len(_batch())
+        partition_log = self.open()
+
+        for _ in range(2):
+            partition_log.append(_batch())
+
+        partition_log.close()
+
+        path = log.segment_path(self.directory, 0, ".log")
+        with open(path, "ab") as file:
+            file.write(_batch()[:size // 2])
+
+        reopened = self.open()
+
+        self.assertEqual(os.path.getsize(path), 2 * size)
+        self.assertEqual(reopened.append(_batch()), (2, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
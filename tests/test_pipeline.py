@@ -0,0 +1,111 @@
+import asyncio
+import unittest
+
+from app import main, protocol
+from app.protocol.message import FetchRequest, FetchResponse, ProduceRequest
+from benchmarks import fixtures
+
+from . import broker
+
+PIPELINED = 40
+
+
+class Reader:
+
+    def __init__(self, requests):
+        self.requests = list(requests)
+
+    async def next(self):
+        await asyncio.sleep(0)
+
+        if not self.requests:
+            raise EOFError("done")
+
+        return self.requests.pop(0)
+
+
+class Writer:
+
+    def __init__(self):
+        self.responses = []
+
+    def queue(self, response):
+        self.responses.append(response)
+
+    def queue_error(self, correlation_id, error_code):
+        self.responses.append((correlation_id, error_code))
+
+    async def flush(self):
+        pass
+
+
+def _produce(correlation_id: int):
+    body = ProduceRequest(
+        acks=1,
+        timeout_ms=1000,
+        topic_data=[
+            ProduceRequest.TopicProduceData(
+                name=broker.topic_name(0),
+                partition_data=[ProduceRequest.PartitionProduceData(0, fixtures.batch([bytes(64 * 1024)] * 4))],
+            ),
+        ],
+    )
+
+    return broker.request(0, 9, body, correlation_id)
+
+
+def _fetch(correlation_id: int, offset: int):
+    body = FetchRequest(
+        max_wait_ms=0,
+        min_bytes=1,
+        topics=[
+            FetchRequest.FetchTopic(
+                topic_id=broker.topic_id(0),
+                partitions=[FetchRequest.FetchPartition(partition=0, fetch_offset=offset, partition_max_bytes=1 << 20)],
+            ),
+        ],
+    )
+
+    return broker.request(1, 16, body, correlation_id)
+
+
+async def _pipeline(requests):
+    main.fetch_purgatory.attach(asyncio.get_running_loop())
+
+    writer = Writer()
+    await main.handle_async(1, Reader(requests), writer)
+
+    return writer.responses
+
+
+class PipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        broker.start(self)
+
+    def test_produces_append_in_request_order(self):
+        responses = asyncio.run(_pipeline(_produce(index) for index in range(PIPELINED)))
+
+        self.assertEqual([response.header.correlation_id for response in responses], list(range(PIPELINED)))
+
+        offsets = [response.body.responses[0].partition_responses[0].base_offset for response in responses]
+        self.assertEqual(offsets, [4 * index for index in range(PIPELINED)])
+
+    def test_fetch_sees_earlier_produce(self):
+        requests = []
+        for index in range(PIPELINED // 2):
+            requests.append(_produce(2 * index))
+            requests.append(_fetch(2 * index + 1, 4 * index))
+
+        responses = asyncio.run(_pipeline(requests))
+
+        for response in responses[1::2]:
+            self.assertIsInstance(response.body, FetchResponse)
+
+            partition = response.body.responses[0].partitions[0]
+            self.assertEqual(partition.error_code, protocol.ErrorCode.NONE)
+            self.assertGreater(len(partition.records), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
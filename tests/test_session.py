@@ -0,0 +1,155 @@
+import os
+import unittest
+
+from app import main, protocol
+from app.protocol.message import FetchRequest, ProduceRequest
+from benchmarks import fixtures
+
+from . import broker
+
+
+def _produce(partition: int):
+    body = ProduceRequest(
+        acks=1,
+        timeout_ms=1000,
+        topic_data=[
+            ProduceRequest.TopicProduceData(
+                name=broker.topic_name(0),
+                partition_data=[ProduceRequest.PartitionProduceData(partition, fixtures.batch([b"value"]))],
+            ),
+        ],
+    )
+
+    response = main.process(broker.request(0, 9, body))
+    assert response.body.responses[0].partition_responses[0].error_code == protocol.ErrorCode.NONE
+
+
+def _fetch(session_id: int, session_epoch: int, partitions=(), forgotten=()):
+    topics = []
+    if partitions:
+        topics.append(FetchRequest.FetchTopic(
+            topic_id=broker.topic_id(0),
+            partitions=[
+                FetchRequest.FetchPartition(partition=partition, fetch_offset=offset, partition_max_bytes=1 << 20)
+                for partition, offset in partitions
+            ],
+        ))
+
+    forgotten_topics_data = []
+    if forgotten:
+        forgotten_topics_data.append(FetchRequest.ForgottenTopic(topic_id=broker.topic_id(0), partitions=list(forgotten)))
+
+    body = FetchRequest(
+        max_wait_ms=0,
+        min_bytes=1,
+        session_id=session_id,
+        session_epoch=session_epoch,
+        topics=topics,
+        forgotten_topics_data=forgotten_topics_data,
+    )
+
+    return main.process(broker.request(1, 16, body)).body
+
+
+def _partitions(response):
+    return {
+        partition.partition_index: partition
+        for topic in response.responses
+        for partition in topic.partitions
+    }
+
+
+class SessionTest(unittest.TestCase):
+
+    def setUp(self):
+        broker.start(self, partitions=3)
+
+        for partition in range(3):
+            os.makedirs(main._partition_directory(broker.topic_name(0), partition))
+
+    def _open(self):
+        response = _fetch(0, 0, [(0, 0), (1, 0), (2, 0)])
+
+        self.assertEqual(response.error_code, protocol.ErrorCode.NONE)
+        self.assertNotEqual(response.session_id, 0)
+
+        return response
+
+    def test_full_fetch_returns_every_partition(self):
+        _produce(1)
+
+        response = self._open()
+
+        partitions = _partitions(response)
+        self.assertEqual(sorted(partitions), [0, 1, 2])
+        self.assertEqual(partitions[1].high_watermark, 1)
+        self.assertEqual(len(main.fetch_sessions), 1)
+
+    def test_sessionless_fetch_opens_no_session(self):
+        response = _fetch(0, -1, [(0, 0), (1, 0)])
+
+        self.assertEqual(response.session_id, 0)
+        self.assertEqual(sorted(_partitions(response)), [0, 1])
+        self.assertEqual(len(main.fetch_sessions), 0)
+
+    def test_incremental_fetch_returns_changed_partitions(self):
+        session_id = self._open().session_id
+
+        response = _fetch(session_id, 1)
+        self.assertEqual(response.error_code, protocol.ErrorCode.NONE)
+        self.assertEqual(response.session_id, session_id)
+        self.assertEqual(response.responses, [])
+
+        _produce(2)
+
+        response = _fetch(session_id, 2)
+        partitions = _partitions(response)
+        self.assertEqual(sorted(partitions), [2])
+        self.assertEqual(partitions[2].high_watermark, 1)
+        self.assertTrue(partitions[2].records)
+
+        response = _fetch(session_id, 3, [(2, 1)])
+        self.assertEqual(response.responses, [])
+
+    def test_forgotten_topics_leave_the_session(self):
+        session_id = self._open().session_id
+
+        response = _fetch(session_id, 1, forgotten=[0, 2])
+        self.assertEqual(response.responses, [])
+
+        for partition in range(3):
+            _produce(partition)
+
+        response = _fetch(session_id, 2)
+        self.assertEqual(sorted(_partitions(response)), [1])
+
+        response = _fetch(session_id, 3, [(0, 1), (1, 1)])
+        self.assertEqual(sorted(_partitions(response)), [0])
+
+    def test_epoch_mismatch(self):
+        session_id = self._open().session_id
+
+        response = _fetch(session_id, 5)
+        self.assertEqual(response.error_code, protocol.ErrorCode.INVALID_FETCH_SESSION_EPOCH)
+        self.assertEqual(response.session_id, 0)
+        self.assertEqual(response.responses, [])
+
+        _produce(0)
+
+        response = _fetch(session_id, 1)
+        self.assertEqual(response.error_code, protocol.ErrorCode.NONE)
+        self.assertEqual(sorted(_partitions(response)), [0])
+
+        response = _fetch(session_id, 1)
+        self.assertEqual(response.error_code, protocol.ErrorCode.INVALID_FETCH_SESSION_EPOCH)
+
+    def test_unknown_session(self):
+        self._open()
+
+        response = _fetch(12345, 1)
+        self.assertEqual(response.error_code, protocol.ErrorCode.FETCH_SESSION_ID_NOT_FOUND)
+        self.assertEqual(response.responses, [])
+
+
+if __name__ == "__main__":
+    unittest.main()